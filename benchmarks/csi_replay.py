@@ -0,0 +1,307 @@
+"""
+csi_replay.py
+----
+Offline CSI replay and throughput benchmark for the CADA path (no MQTT broker needed).
+
+Key Functions
+----
+• make_synthetic_payloads function: ESP-style "time=... CSI values: ..." text (or binary frame) payloads per topic.
+• load_payloads function: Recorded payloads, one "topic<TAB>payload" per line.
+• bench_parse / bench_push / bench_handler functions: Per-stage replay with latency percentiles.
+
+Usage
+----
+    python benchmarks/csi_replay.py --sensors 8 --packets 2000 --rate 100
+    python benchmarks/csi_replay.py --mode multi --stages push,handler --rate 0
+    python benchmarks/csi_replay.py --payload-file capture.txt --stages handler
+    python benchmarks/csi_replay.py --wire binary8 --stages parse,handler --rate 0
+"""
+
+import autorootcwd
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.CADA.CADA_process import (
+    BACKPRESSURE_POLICIES, WIRE_FORMATS, SlidingCadaProcessor, MultiTopicCadaProcessor,
+    encode_binary_payload, load_calibration_data, parse_and_normalize_payload,
+)
+from src.CADA.csi_buffer_utils import RealtimeCSIBufferManager
+
+SUBCARRIERS = 52
+INDICES_TO_REMOVE = list(range(21, 32))
+WINDOW_SIZE = 320
+STRIDE = 40
+SMALL_WIN_SIZE = 64
+
+
+# === 입력 생성 / 로드 =========================================================
+
+def make_synthetic_payloads(topics, packets_per_topic, rate_hz=100.0, seed=0, calib=None, wire="text"):
+    """Generates interleaved (topic, payload) pairs with periodic activity bursts.
+
+    wire="binary8" / "binary16" produces encode_binary_payload frames (bytes) instead of text.
+
+    Amplitudes follow the topic's calibration (mu, sigma) when available so the
+    Z-scored stream looks like a quiet room with occasional movement.
+    """
+    rng = np.random.default_rng(seed)
+    keep = np.setdiff1d(np.arange(SUBCARRIERS), INDICES_TO_REMOVE)
+    start = datetime.now()
+    per_topic = {}
+    for topic in topics:
+        mu = np.full(SUBCARRIERS, 20.0)
+        sigma = np.full(SUBCARRIERS, 2.0)
+        if calib and topic in calib[0]:
+            mu[keep], sigma[keep] = calib[0][topic], calib[1][topic]
+        noise = rng.normal(size=(packets_per_topic, SUBCARRIERS))
+        # 500 패킷 주기로 100 패킷 동안 움직임(진폭 변동 증가)
+        burst = (np.arange(packets_per_topic) % 500) >= 400
+        noise[burst] *= 4.0
+        amp = np.clip(mu + sigma * noise, 0, None)
+        phase = rng.uniform(-np.pi, np.pi, size=amp.shape)
+        iq = np.empty((packets_per_topic, SUBCARRIERS * 2), dtype=np.int64)
+        iq[:, 0::2] = np.rint(amp * np.cos(phase))
+        iq[:, 1::2] = np.rint(amp * np.sin(phase))
+        lines = []
+        for k in range(packets_per_topic):
+            ts = (start + timedelta(seconds=k / rate_hz)).strftime("%y%m%d%H%M%S%f")[:15]
+            if wire != "text":
+                lines.append(encode_binary_payload(int(ts), iq[k], wire))
+                continue
+            lines.append(f"CSI_DATA,time={ts},rssi=-42 CSI values: {' '.join(map(str, iq[k]))}")
+        per_topic[topic] = lines
+
+    return [(topic, per_topic[topic][k]) for k in range(packets_per_topic) for topic in topics]
+
+
+def load_payloads(path, topics):
+    """Reads 'topic<TAB>payload' lines; lines without a topic are assigned round-robin."""
+    packets = []
+    with open(path, "r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            topic, sep, payload = line.partition("\t")
+            if not sep:
+                topic, payload = topics[i % len(topics)], line
+            packets.append((topic, payload))
+    return packets
+
+
+# === 계측 보조 ================================================================
+
+class _CountingDict(dict):
+    """cada_ewma_states replacement counting completed windows (one EWMA write per window)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writes = 0
+
+    def __setitem__(self, key, value):
+        self.writes += 1
+        super().__setitem__(key, value)
+
+
+class _NullPublisher:
+    """Stands in for the ptz/trigger paho client."""
+
+    def __init__(self):
+        self.published = 0
+
+    def publish(self, topic, payload):
+        self.published += 1
+
+
+def _percentiles(lat_ns):
+    lat_us = np.asarray(lat_ns, dtype=np.float64) / 1e3
+    if lat_us.size == 0:
+        return {"p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    p50, p90, p99 = np.percentile(lat_us, [50, 90, 99])
+    return {"p50": p50, "p90": p90, "p99": p99, "max": float(lat_us.max())}
+
+
+def _expected_windows(packets_per_topic):
+    """Number of stride boundaries with a full window, i.e. windows the processors should emit."""
+    return sum(max(0, n // STRIDE - (WINDOW_SIZE - 1) // STRIDE) for n in packets_per_topic.values())
+
+
+def _replay(packets, fn, rate_hz, n_topics):
+    """Calls fn(topic, payload) for each packet, paced to rate_hz per topic (0 = as fast as possible)."""
+    lat = np.empty(len(packets), dtype=np.int64)
+    period = 1.0 / (rate_hz * n_topics) if rate_hz > 0 else 0.0
+    t_start = time.perf_counter()
+    for i, (topic, payload) in enumerate(packets):
+        if period:
+            delay = t_start + i * period - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        t0 = time.perf_counter_ns()
+        fn(topic, payload)
+        lat[i] = time.perf_counter_ns() - t0
+    return lat, time.perf_counter() - t_start
+
+
+def _build_processors(mode, topics, buf_mgr, policy="drop_newest", backend=None):
+    if mode == "multi":
+        return MultiTopicCadaProcessor(topics, buf_mgr, WINDOW_SIZE, STRIDE, SMALL_WIN_SIZE).ports()
+    return {
+        topic: SlidingCadaProcessor(topic, buf_mgr, WINDOW_SIZE, STRIDE, SMALL_WIN_SIZE,
+                                    policy=policy, backend=backend)
+        for topic in topics
+    }
+
+
+def _scheduler_stats(processors):
+    """Sums stats() of the distinct processors behind `processors`."""
+    owners = {getattr(p, "_owner", p) for p in processors.values()}
+    total = {"windows_dropped": 0, "windows_coalesced": 0}
+    for owner in owners:
+        stats = owner.stats()
+        for key in total:
+            total[key] += stats[key]
+    return total
+
+
+def _wait_idle(processors, timeout=10.0):
+    """Waits until background window processing has drained."""
+    owners = {getattr(p, "_owner", p) for p in processors.values()}
+    deadline = time.time() + timeout
+    while time.time() < deadline and any(o._processing_running for o in owners):
+        time.sleep(0.001)
+
+
+def _new_buffer_manager(topics):
+    buf_mgr = RealtimeCSIBufferManager(topics)
+    load_calibration_data(topics, buf_mgr.mu_bg_dict, buf_mgr.sigma_bg_dict)
+    buf_mgr.cada_ewma_states = _CountingDict(buf_mgr.cada_ewma_states)
+    return buf_mgr
+
+
+# === 단계별 벤치마크 ==========================================================
+
+def bench_parse(packets, topics, rate_hz):
+    buf_mgr = _new_buffer_manager(topics)
+
+    def fn(topic, payload):
+        parse_and_normalize_payload(payload, topic, SUBCARRIERS, INDICES_TO_REMOVE,
+                                    buf_mgr.mu_bg_dict, buf_mgr.sigma_bg_dict)
+
+    lat, elapsed = _replay(packets, fn, rate_hz, len(topics))
+    return {"stage": "parse", "lat": lat, "elapsed": elapsed}
+
+
+def bench_push(packets, topics, rate_hz, mode, policy, backend=None):
+    buf_mgr = _new_buffer_manager(topics)
+    processors = _build_processors(mode, topics, buf_mgr, policy, backend)
+    # 파싱 비용을 제외하기 위해 미리 파싱
+    parsed = []
+    for topic, payload in packets:
+        res = parse_and_normalize_payload(payload, topic, SUBCARRIERS, INDICES_TO_REMOVE,
+                                          buf_mgr.mu_bg_dict, buf_mgr.sigma_bg_dict)
+        if res is not None:
+            parsed.append((topic, res))
+
+    lat, elapsed = _replay(parsed, lambda topic, res: processors[topic].push(*res), rate_hz, len(topics))
+    _wait_idle(processors)
+    return {"stage": f"push[{mode}]", "lat": lat, "elapsed": elapsed,
+            "windows": buf_mgr.cada_ewma_states.writes, **_scheduler_stats(processors)}
+
+
+def bench_handler(packets, topics, rate_hz, mode, policy, backend=None):
+    from demo.utils.mqtt_manager import MQTTManager
+
+    buf_mgr = _new_buffer_manager(topics)
+    processors = _build_processors(mode, topics, buf_mgr, policy, backend)
+    publisher = _NullPublisher()
+    manager = MQTTManager(sio=None, topics=topics, broker_address=None, broker_port=None,
+                          subcarriers=SUBCARRIERS, indices_to_remove=INDICES_TO_REMOVE,
+                          buffer_manager=buf_mgr, sliding_processors=processors,
+                          fps_limit=10, trigger_client=publisher)
+
+    lat, elapsed = _replay(packets, manager.mqtt_handler, rate_hz, len(topics))
+    _wait_idle(processors)
+    return {"stage": f"handler[{mode}]", "lat": lat, "elapsed": elapsed,
+            "windows": buf_mgr.cada_ewma_states.writes, "triggers": publisher.published,
+            **_scheduler_stats(processors)}
+
+
+def _report(result, packets_per_topic):
+    lat = result["lat"]
+    pct = _percentiles(lat)
+    busy = lat.sum() / 1e9
+    line = (f"{result['stage']:<20} n={len(lat):>7}  "
+            f"wall={len(lat) / result['elapsed']:>10.0f} pkt/s  cpu={len(lat) / max(busy, 1e-9):>10.0f} pkt/s  "
+            f"p50={pct['p50']:8.1f}us p90={pct['p90']:8.1f}us p99={pct['p99']:8.1f}us max={pct['max']:9.1f}us")
+    if "windows" in result:
+        expected = _expected_windows(packets_per_topic)
+        line += (f"  windows={result['windows']}/{expected} missing={max(0, expected - result['windows'])}"
+                 f" (dropped={result['windows_dropped']} coalesced={result['windows_coalesced']})")
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline CSI replay / CADA throughput benchmark")
+    parser.add_argument("--sensors", type=int, default=8, help="Number of simulated topics")
+    parser.add_argument("--packets", type=int, default=2000, help="Packets per topic (synthetic)")
+    parser.add_argument("--rate", type=float, default=100.0, help="Packets/sec per topic, 0 = unpaced")
+    parser.add_argument("--mode", choices=["batch", "multi"], default="batch",
+                        help="CADA processor used by the push/handler stages")
+    parser.add_argument("--policy", choices=list(BACKPRESSURE_POLICIES), default="drop_newest",
+                        help="SlidingCadaProcessor backpressure policy (batch mode)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Run batch-mode CADA in N worker processes (SharedMemoryCadaPool)")
+    parser.add_argument("--stages", default="parse,push,handler", help="Comma separated stages")
+    parser.add_argument("--payload-file", default=None, help="Recorded payloads (topic<TAB>payload per line)")
+    parser.add_argument("--payload-type", choices=["bytes", "str"], default="bytes",
+                        help="bytes: raw MQTT payloads as delivered by MQTTManager, str: decoded text")
+    parser.add_argument("--wire", choices=list(WIRE_FORMATS), default="text",
+                        help="Synthetic payload wire format (binary formats are always bytes)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    topics = [f"L0382/ESP/{i + 1}" for i in range(args.sensors)]
+    if args.payload_file:
+        packets = load_payloads(args.payload_file, topics)
+        topics = sorted({topic for topic, _ in packets})
+    else:
+        mu_bg, sigma_bg = {}, {}
+        load_calibration_data(topics, mu_bg, sigma_bg)
+        packets = make_synthetic_payloads(topics, args.packets, rate_hz=args.rate or 100.0,
+                                          seed=args.seed, calib=(mu_bg, sigma_bg), wire=args.wire)
+
+    if args.payload_type == "bytes":
+        packets = [(topic, payload.encode() if isinstance(payload, str) else payload) for topic, payload in packets]
+
+    packets_per_topic = {topic: 0 for topic in topics}
+    for topic, _ in packets:
+        packets_per_topic[topic] += 1
+
+    backend = None
+    if args.workers > 0 and args.mode == "batch":
+        from src.CADA.cada_process_pool import SharedMemoryCadaPool
+        backend = SharedMemoryCadaPool(max_workers=args.workers)
+        backend.warmup()
+
+    print(f"[bench] topics={len(topics)} packets={len(packets)} rate={args.rate}/s/topic "
+          f"mode={args.mode} policy={args.policy} workers={args.workers} payload={args.payload_type} wire={args.wire}")
+    for stage in [s.strip() for s in args.stages.split(",") if s.strip()]:
+        if stage == "parse":
+            result = bench_parse(packets, topics, args.rate)
+        elif stage == "push":
+            result = bench_push(packets, topics, args.rate, args.mode, args.policy, backend)
+        elif stage == "handler":
+            result = bench_handler(packets, topics, args.rate, args.mode, args.policy, backend)
+        else:
+            raise ValueError(f"unknown stage: {stage}")
+        _report(result, packets_per_topic)
+
+    if backend is not None:
+        backend.close()
+
+
+if __name__ == "__main__":
+    main()
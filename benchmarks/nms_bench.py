@@ -0,0 +1,123 @@
+"""
+nms_bench.py
+----
+Microbenchmark of the vectorized NMS (src.utils.batched_nms) against the per-box loop NMS.
+
+Key Functions
+----
+• make_boxes function: Random clustered boxes / scores / class ids (YOLO-like overlap).
+• loop_nms / loop_multiclass_nms functions: The previous while-loop implementation (reference).
+• bench function: Keep-set parity check and timing per box count.
+
+Usage
+----
+    python benchmarks/nms_bench.py
+    python benchmarks/nms_bench.py --boxes 100,1000,3000 --classes 80 --images 4
+"""
+
+import autorootcwd
+import argparse
+import time
+
+import numpy as np
+
+from src.utils import batched_nms, compute_iou, multiclass_nms
+
+
+def make_boxes(n, n_classes=1, seed=0, size=640):
+    """n boxes scattered around n/8 centers, so many of them overlap."""
+    rng = np.random.default_rng(seed)
+    n_centers = max(1, n // 8)
+    centers = rng.uniform(0, size, (n_centers, 2))
+    wh = rng.uniform(20, 200, (n_centers, 2))
+    pick = rng.integers(0, n_centers, n)
+    c = centers[pick] + rng.normal(0, 8, (n, 2))
+    half = wh[pick] * rng.uniform(0.8, 1.2, (n, 2)) / 2
+    boxes = np.concatenate([c - half, c + half], axis=1).astype(np.float32)
+    scores = rng.uniform(0.05, 1.0, n).astype(np.float32)
+    class_ids = rng.integers(0, n_classes, n)
+    return boxes, scores, class_ids
+
+
+# === 기존 루프 구현 (비교 기준) ================================================
+
+def loop_nms(boxes, scores, iou_threshold):
+    # 동점 순서를 정하기 위해 안정 정렬 (기존 구현은 기본 argsort 라 동점 순서가 정의되지 않음)
+    sorted_indices = np.argsort(scores, kind="stable")[::-1]
+
+    keep_boxes = []
+    while sorted_indices.size > 0:
+        box_id = sorted_indices[0]
+        keep_boxes.append(box_id)
+        ious = compute_iou(boxes[box_id, :], boxes[sorted_indices[1:], :])
+        keep_indices = np.where(ious < iou_threshold)[0]
+        sorted_indices = sorted_indices[keep_indices + 1]
+
+    return keep_boxes
+
+
+def loop_multiclass_nms(boxes, scores, class_ids, iou_threshold):
+    keep_boxes = []
+    for class_id in np.unique(class_ids):
+        class_indices = np.where(class_ids == class_id)[0]
+        class_keep_boxes = loop_nms(boxes[class_indices, :], scores[class_indices], iou_threshold)
+        keep_boxes.extend(class_indices[class_keep_boxes])
+    return keep_boxes
+
+
+# === 측정 =====================================================================
+
+def _time_ms(fn, repeats):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - t0) / repeats * 1000
+
+
+def bench(n_boxes, n_classes, n_images, iou_threshold, repeats, seed=0):
+    boxes, scores, class_ids = make_boxes(n_boxes * n_images, n_classes, seed)
+    image_ids = np.repeat(np.arange(n_images), n_boxes)
+
+    def loop():
+        keep = []
+        for i in range(n_images):
+            sl = slice(i * n_boxes, (i + 1) * n_boxes)
+            kept = loop_multiclass_nms(boxes[sl], scores[sl], class_ids[sl], iou_threshold)
+            keep.extend(np.asarray(kept, dtype=int) + i * n_boxes)
+        return keep
+
+    def vectorized():
+        return batched_nms(boxes, scores, iou_threshold, class_ids=class_ids, image_ids=image_ids)
+
+    same = set(map(int, loop())) == set(map(int, vectorized()))
+    if n_images == 1:
+        same &= loop_multiclass_nms(boxes, scores, class_ids, iou_threshold) == \
+            multiclass_nms(boxes, scores, class_ids, iou_threshold)
+
+    t_loop = _time_ms(loop, repeats)
+    t_vec = _time_ms(vectorized, repeats)
+    print(f"[nms] boxes={n_boxes:>5} x {n_images} images classes={n_classes:>2} kept={len(vectorized()):>5} "
+          f"loop={t_loop:8.2f}ms vectorized={t_vec:8.2f}ms speedup={t_loop / t_vec:5.1f}x same={same}")
+    return same
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized vs loop NMS microbenchmark")
+    parser.add_argument("--boxes", default="50,300,1000", help="Comma separated boxes per image")
+    parser.add_argument("--classes", type=int, default=1)
+    parser.add_argument("--images", type=int, default=1)
+    parser.add_argument("--iou", type=float, default=0.5)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    ok = True
+    for n in [int(x) for x in args.boxes.split(",") if x.strip()]:
+        ok &= bench(n, args.classes, args.images, args.iou, args.repeats, args.seed)
+    if not ok:
+        raise SystemExit("keep sets differ")
+
+
+if __name__ == "__main__":
+    main()
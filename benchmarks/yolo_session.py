@@ -0,0 +1,186 @@
+"""
+yolo_session.py
+----
+ONNX Runtime session tuning / INT8 comparison benchmark for the YOLOv10 detector.
+
+Key Functions
+----
+• load_frames function: BGR frames from an image directory (or synthetic noise frames).
+• quantize_model function: INT8 dynamic quantization of an FP32 model (onnxruntime.quantization).
+• bench_latency function: Per-frame detect latency (preprocess + session + postprocess) percentiles.
+• compare_detections function: Detection parity of a candidate model against the FP32 reference.
+
+Usage
+----
+    python benchmarks/yolo_session.py --images samples/ --frames 50
+    python benchmarks/yolo_session.py --int8 models/yolov10n_int8.onnx --quantize
+    python benchmarks/yolo_session.py --model model.onnx --intra 4 --opt extended
+"""
+
+import autorootcwd
+import argparse
+import os
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import onnxruntime
+
+from demo.config.settings import (
+    YOLO_MODEL_REPO, YOLO_MODEL_FILE,
+    YOLO_INTRA_OP_THREADS, YOLO_INTER_OP_THREADS, YOLO_GRAPH_OPTIMIZATION, YOLO_EXECUTION_MODE,
+)
+from src.utils import YOLOv10, compute_iou, create_session_options
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+# === 입력 / 모델 ==============================================================
+
+def load_frames(image_dir, n_frames, size=(640, 480), seed=0):
+    """Returns up to n_frames BGR frames from image_dir, or synthetic frames if image_dir is None."""
+    if image_dir:
+        paths = sorted(p for p in Path(image_dir).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+        frames = [cv2.imread(str(p)) for p in paths[:n_frames]]
+        frames = [f for f in frames if f is not None]
+        if not frames:
+            raise FileNotFoundError(f"no readable images in {image_dir}")
+        return frames
+
+    # 잡음 영상: 지연 측정용 (검출 parity 는 실제 영상에서만 의미 있음)
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8) for _ in range(n_frames)]
+
+
+def resolve_model(path):
+    """Local path as is, otherwise a filename in YOLO_MODEL_REPO on the HF Hub."""
+    if Path(path).is_file():
+        return path
+    from huggingface_hub import hf_hub_download
+    return hf_hub_download(repo_id=YOLO_MODEL_REPO, filename=path)
+
+
+def quantize_model(src, dst):
+    """Writes an INT8 (dynamic, per-channel weights) copy of the FP32 model `src` to `dst`."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    quantize_dynamic(src, dst, per_channel=True, weight_type=QuantType.QUInt8)
+    return dst
+
+
+# === 측정 =====================================================================
+
+def bench_latency(model, frames, conf_threshold, repeats=3, warmup=5):
+    for frame in frames[:warmup]:
+        model.detect(frame, conf_threshold)
+
+    lat_ns = []
+    for _ in range(repeats):
+        for frame in frames:
+            t0 = time.perf_counter_ns()
+            model.detect(frame, conf_threshold)
+            lat_ns.append(time.perf_counter_ns() - t0)
+    lat_ms = np.asarray(lat_ns) / 1e6
+    return {
+        "p50_ms": float(np.percentile(lat_ms, 50)),
+        "p90_ms": float(np.percentile(lat_ms, 90)),
+        "p99_ms": float(np.percentile(lat_ms, 99)),
+        "fps": 1000.0 / float(np.mean(lat_ms)),
+    }
+
+
+def compare_detections(reference, candidate, iou_threshold=0.5):
+    """Greedy same-class IoU matching of candidate detections against the reference.
+
+    Returns:
+        recall (matched / reference), precision (matched / candidate), mean |score diff| of matches
+    """
+    matched = n_ref = n_cand = 0
+    score_diff = []
+    for (ref_boxes, ref_scores, ref_ids), (boxes, scores, ids) in zip(reference, candidate):
+        n_ref += len(ref_boxes)
+        n_cand += len(boxes)
+        used = np.zeros(len(boxes), dtype=bool)
+        for box, score, class_id in zip(ref_boxes, ref_scores, ref_ids):
+            candidates = np.flatnonzero((ids == class_id) & ~used)
+            if candidates.size == 0:
+                continue
+            ious = compute_iou(box, boxes[candidates])
+            best = int(np.argmax(ious))
+            if ious[best] >= iou_threshold:
+                used[candidates[best]] = True
+                matched += 1
+                score_diff.append(abs(float(score) - float(scores[candidates[best]])))
+    return {
+        "recall": matched / n_ref if n_ref else 1.0,
+        "precision": matched / n_cand if n_cand else 1.0,
+        "score_mae": float(np.mean(score_diff)) if score_diff else 0.0,
+        "detections": f"{n_cand}/{n_ref}",
+    }
+
+
+def _report(name, latency, parity=None):
+    line = (f"[{name:>10}] p50={latency['p50_ms']:.2f}ms p90={latency['p90_ms']:.2f}ms "
+            f"p99={latency['p99_ms']:.2f}ms fps={latency['fps']:.1f}")
+    if parity is not None:
+        line += (f"  recall={parity['recall']:.3f} precision={parity['precision']:.3f} "
+                 f"score_mae={parity['score_mae']:.4f} dets={parity['detections']}")
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLOv10 ONNX Runtime session / INT8 benchmark")
+    parser.add_argument("--model", default=YOLO_MODEL_FILE, help="FP32 model (local path or HF repo filename)")
+    parser.add_argument("--int8", default=None, help="INT8-quantized model (local path or HF repo filename)")
+    parser.add_argument("--quantize", action="store_true",
+                        help="Create --int8 from --model with dynamic quantization if it does not exist")
+    parser.add_argument("--images", default=None, help="Directory of test images (default: synthetic frames)")
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--conf", type=float, default=0.3)
+    parser.add_argument("--intra", type=int, default=YOLO_INTRA_OP_THREADS, help="intra_op_num_threads")
+    parser.add_argument("--inter", type=int, default=YOLO_INTER_OP_THREADS, help="inter_op_num_threads")
+    parser.add_argument("--opt", default=YOLO_GRAPH_OPTIMIZATION, help="disable | basic | extended | all")
+    parser.add_argument("--exec-mode", default=YOLO_EXECUTION_MODE, help="sequential | parallel")
+    args = parser.parse_args()
+
+    fp32_path = resolve_model(args.model)
+    int8_path = None
+    if args.int8:
+        if args.quantize and not Path(args.int8).is_file():
+            print(f"[bench] quantizing {fp32_path} -> {args.int8}")
+            int8_path = quantize_model(fp32_path, args.int8)
+        else:
+            int8_path = resolve_model(args.int8)
+
+    frames = load_frames(args.images, args.frames)
+    if args.images is None:
+        print("[bench] synthetic frames: latency only, parity numbers are not meaningful")
+
+    def tuned():
+        return create_session_options(args.intra, args.inter, args.opt, args.exec_mode)
+
+    configs = [
+        ("fp32", fp32_path, onnxruntime.SessionOptions()),
+        ("fp32-tuned", fp32_path, tuned()),
+    ]
+    if int8_path:
+        configs.append(("int8-tuned", int8_path, tuned()))
+
+    print(f"[bench] frames={len(frames)} repeats={args.repeats} intra={args.intra} inter={args.inter} "
+          f"opt={args.opt} exec_mode={args.exec_mode}")
+    reference = None
+    for name, path, options in configs:
+        model = YOLOv10(path, session_options=options)
+        latency = bench_latency(model, frames, args.conf, repeats=args.repeats)
+        detections = [model.detect(frame, args.conf) for frame in frames]
+        if reference is None:
+            reference = detections
+            _report(name, latency)
+        else:
+            _report(name, latency, compare_detections(reference, detections))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 import autorootcwd
+import itertools
 import json
+import time
 from pathlib import Path
 
 import cv2
+import numpy as np
 import gradio as gr
 from fastapi import FastAPI
 from fastapi.responses import HTMLResponse
@@ -12,21 +15,157 @@ from huggingface_hub import hf_hub_download
 from pydantic import BaseModel, Field
 import socketio
 
+from demo.config.settings import (
+    YOLO_MODEL_REPO, YOLO_MODEL_FILE,
+    YOLO_INTRA_OP_THREADS, YOLO_INTER_OP_THREADS, YOLO_GRAPH_OPTIMIZATION, YOLO_EXECUTION_MODE,
+    YOLO_OPTIMIZED_MODEL_CACHE, YOLO_CLASSES, YOLO_DRAW_DETECTIONS,
+    YOLO_ASYNC_INFERENCE, YOLO_BATCH_INFERENCE, YOLO_MAX_BATCH, YOLO_BATCH_WAIT_MS,
+    YOLO_CSI_GATING, YOLO_GATE_HOLD_OFF, YOLO_GATE_KEEPALIVE,
+    YOLO_OUTPUT_SIZE, YOLO_ADAPTIVE_CONTROL, YOLO_LATENCY_BUDGET_MS, YOLO_INPUT_SCALES, YOLO_MAX_FRAME_SKIP,
+    YOLO_TRACKING, YOLO_DETECT_INTERVAL, YOLO_TRACK_IOU, YOLO_TRACK_MAX_AGE, YOLO_TRACK_MIN_HITS,
+)
 from demo.services.cada import CADAService
-from src.utils import YOLOv10
+from demo.utils.frame_controller import AdaptiveFrameController
+from demo.utils.inference_gate import InferenceGate
+from src.tracker import IoUKalmanTracker, Tracks, draw_tracks
+from src.utils import YOLOv10, LatestFrameInference, BatchedInferenceServer, create_session_options
 
 
 cur_dir = Path(__file__).parent    
 
-model_file = hf_hub_download(
-    repo_id="onnx-community/yolov10n", filename="onnx/model.onnx"
+sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
+
+# CADA 를 모델보다 먼저 초기화: CSI_PROCESS_POOL_WORKERS 워커 프로세스는
+# ONNX Runtime 세션(스레드 풀)과 추론 워커 스레드가 생기기 전에 fork 되어야 함
+cada_service = CADAService(sio)
+cada_service.initialize()
+
+# 로컬 파일이 있으면 그대로 사용, 아니면 HF Hub 에서 다운로드
+model_file = YOLO_MODEL_FILE if Path(YOLO_MODEL_FILE).is_file() else hf_hub_download(
+    repo_id=YOLO_MODEL_REPO, filename=YOLO_MODEL_FILE
+)
+model = YOLOv10(
+    model_file,
+    session_options=create_session_options(
+        intra_op_threads=YOLO_INTRA_OP_THREADS,
+        inter_op_threads=YOLO_INTER_OP_THREADS,
+        graph_optimization=YOLO_GRAPH_OPTIMIZATION,
+        execution_mode=YOLO_EXECUTION_MODE,
+    ),
+    optimized_model_path=YOLO_OPTIMIZED_MODEL_CACHE or None,
+    classes=YOLO_CLASSES,
 )
-model = YOLOv10(model_file)
+# 트래킹 모드에서는 검출기가 Detections 를 반환하고 박스는 트랙으로 그림
+draw_in_detector = YOLO_DRAW_DETECTIONS and not YOLO_TRACKING
+if YOLO_BATCH_INFERENCE:
+    # 스트림별 핸들러 호출을 하나의 배치 추론으로 합침
+    inference_worker = BatchedInferenceServer(
+        model, max_batch=YOLO_MAX_BATCH, max_wait_ms=YOLO_BATCH_WAIT_MS, draw=draw_in_detector
+    )
+elif YOLO_ASYNC_INFERENCE:
+    inference_worker = LatestFrameInference(model, draw=draw_in_detector)
+else:
+    inference_worker = None
+
+# 비동기 모드는 워커가 이미 밀린 프레임을 건너뜀 → 해상도만 조절
+controller_max_skip = 0 if isinstance(inference_worker, LatestFrameInference) else YOLO_MAX_FRAME_SKIP
+if YOLO_ADAPTIVE_CONTROL and not model.dynamic_input_size and controller_max_skip == 0:
+    # 입력 크기가 고정된 모델은 해상도를 바꿀 수 없음 → 조절할 것이 없음
+    print(f"[YOLOv10] adaptive control disabled: model input is fixed at {model.input_width}x{model.input_height}")
+    frame_controller = None
+elif YOLO_ADAPTIVE_CONTROL:
+    frame_controller = AdaptiveFrameController(
+        model,
+        budget_ms=YOLO_LATENCY_BUDGET_MS,
+        # 고정 입력 모델은 해상도 조절 없이 프레임 건너뛰기만
+        scales=YOLO_INPUT_SCALES if model.dynamic_input_size else (1.0,),
+        max_skip=controller_max_skip,
+    )
+else:
+    frame_controller = None
+# 컨트롤러에 반영한 비동기 워커의 마지막 결과 번호
+recorded_results = 0
+
+# 트랙은 정규화 좌표(0~1)로 유지 → 입력 해상도가 바뀌어도 연속
+tracker = IoUKalmanTracker(
+    iou_threshold=YOLO_TRACK_IOU, max_age=YOLO_TRACK_MAX_AGE, min_hits=YOLO_TRACK_MIN_HITS
+) if YOLO_TRACKING else None
+frame_counter = itertools.count()
+tracked_result = None
+
+# YOLO_DRAW_DETECTIONS = False 일 때 최신 검출 결과 (Detections, 트래킹 모드는 Tracks)
+latest_detections = None
+
+def render_tracks(image, tracks):
+    global latest_detections
+    output = cv2.resize(image, YOLO_OUTPUT_SIZE)
+    width, height = YOLO_OUTPUT_SIZE
+    tracks = tracks._replace(boxes=tracks.boxes * np.array([width, height, width, height], dtype=np.float32))
+    if not YOLO_DRAW_DETECTIONS:
+        latest_detections = tracks
+        return output
+    return draw_tracks(output, tracks)
 
 def detection(image, conf_threshold=0.3):
-    image = cv2.resize(image, (model.input_width, model.input_height))
-    new_image = model.detect_objects(image, conf_threshold)
-    return cv2.resize(new_image, (500, 500))
+    global latest_detections, tracked_result, recorded_results
+    if inference_gate is not None and not inference_gate.should_run():
+        # CSI 활동 없음: 추론 생략
+        return cv2.resize(image, YOLO_OUTPUT_SIZE)
+
+    run = True
+    if tracker is not None:
+        # 검출은 YOLO_DETECT_INTERVAL 프레임마다, 사이 프레임은 트랙 예측으로 채움
+        run = next(frame_counter) % YOLO_DETECT_INTERVAL == 0
+    if run and frame_controller is not None:
+        run = frame_controller.should_process()
+    if not run:
+        if tracker is not None:
+            return render_tracks(image, tracker.predict())
+        return cv2.resize(image, YOLO_OUTPUT_SIZE)
+
+    start = time.perf_counter()
+    # 프레임은 원본 해상도 그대로: 네트워크 입력 크기로의 축소는 fill_input 에서만
+    # (입력 해상도를 낮춰도 출력 영상 화질은 유지)
+    if isinstance(inference_worker, BatchedInferenceServer):
+        result = inference_worker.detect_objects(image, conf_threshold)
+    elif inference_worker is not None:
+        # 최신 추론 결과를 즉시 반환 (첫 결과 전에는 None)
+        result = inference_worker(image, conf_threshold)
+    elif draw_in_detector:
+        result = model.detect_objects(image, conf_threshold)
+    else:
+        result = model.detect(image, conf_threshold)
+
+    if frame_controller is not None:
+        if isinstance(inference_worker, LatestFrameInference):
+            # 핸들러는 추론을 기다리지 않으므로 워커의 추론 시간 사용
+            # (같은 결과가 반복 반환되므로 새 결과가 나왔을 때만 한 번 기록)
+            processed, latency_ms = inference_worker.latency_sample()
+            if processed != recorded_results:
+                recorded_results = processed
+                frame_controller.record(latency_ms)
+        else:
+            frame_controller.record((time.perf_counter() - start) * 1000)
+
+    if tracker is not None:
+        # 비동기 모드는 같은 결과가 반복되므로 새 결과일 때만 트랙 보정
+        if result is not None and result is not tracked_result:
+            tracked_result = result
+            height, width = image.shape[:2]
+            scale = np.array([width, height, width, height], dtype=np.float32)
+            tracks = tracker.update(result._replace(boxes=result.boxes / scale))
+        else:
+            tracks = tracker.predict()
+        return render_tracks(image, tracks)
+
+    if not YOLO_DRAW_DETECTIONS:
+        # 렌더링 생략: 검출 결과만 보관하고 원본 프레임을 그대로 반환
+        if result is not None:
+            latest_detections = result
+        result = image
+    elif result is None:
+        result = image
+    return cv2.resize(result, YOLO_OUTPUT_SIZE)
 
 stream = Stream(
     handler=detection,
@@ -37,12 +176,16 @@ stream = Stream(
     concurrency_limit=2 if get_space() else None,
 )
 
-sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
 fastapi_app = FastAPI()
 
-cada_service = CADAService(sio)
 cada_service.start()
 
+inference_gate = InferenceGate(
+    cada_service.is_activity_detected,
+    hold_off=YOLO_GATE_HOLD_OFF,
+    keepalive_interval=YOLO_GATE_KEEPALIVE,
+) if YOLO_CSI_GATING else None
+
 stream.mount(fastapi_app)
 
 # Socket.IO 이벤트 핸들러 -----------------------------------------
@@ -54,6 +197,18 @@ async def connect(sid, environ):
         import asyncio
         cada_service.mqtt_manager.loop = asyncio.get_running_loop()
         print("[SocketIO] event loop bound to MQTTManager")
+    cada_service.start_emitter()
+
+
+@fastapi_app.on_event("startup")
+async def startup():
+    # CSI_MQTT_ASYNCIO: 이벤트 루프가 돌기 시작한 뒤 MQTT 연결
+    cada_service.start()
+
+
+@fastapi_app.on_event("shutdown")
+def shutdown():
+    cada_service.stop()
 
 
 @sio.event(namespace="/csi")
@@ -75,6 +230,35 @@ class InputData(BaseModel):
 async def update_threshold(data: InputData):
     stream.set_input(data.webrtc_id, data.conf_threshold)
 
+@fastapi_app.get("/stats/inference")
+async def inference_stats():
+    stats = inference_worker.stats() if inference_worker is not None else {}
+    if inference_gate is not None:
+        stats["gate"] = inference_gate.stats()
+    if frame_controller is not None:
+        stats["controller"] = frame_controller.stats()
+    return stats
+
+@fastapi_app.get("/stats/csi")
+async def csi_stats():
+    return {
+        "ingest": cada_service.get_ingest_stats(),
+        "processors": cada_service.get_processor_stats(),
+    }
+
+@fastapi_app.get("/detections/latest")
+async def detections_latest():
+    if latest_detections is None:
+        return {}
+    result = {
+        "boxes": latest_detections.boxes.tolist(),
+        "scores": latest_detections.scores.tolist(),
+        "class_ids": latest_detections.class_ids.tolist(),
+    }
+    if isinstance(latest_detections, Tracks):
+        result["track_ids"] = latest_detections.ids.tolist()
+    return result
+
 app = socketio.ASGIApp(sio, other_asgi_app=fastapi_app)
 
 if __name__ == "__main__":
@@ -11,6 +11,34 @@ HOST = '0.0.0.0'
 PORT = 5001
 DEBUG = True
 
+# Detection settings
+YOLO_MODEL_REPO = "onnx-community/yolov10n"
+YOLO_MODEL_FILE = "onnx/model.onnx"  # INT8 양자화 모델: 같은 repo 의 양자화 파일명 또는 로컬 .onnx 경로
+YOLO_INTRA_OP_THREADS = 0     # 0: ONNX Runtime 기본값 (물리 코어 수)
+YOLO_INTER_OP_THREADS = 0     # YOLO_EXECUTION_MODE = "parallel" 일 때만 사용
+YOLO_GRAPH_OPTIMIZATION = "all"      # disable | basic | extended | all
+YOLO_EXECUTION_MODE = "sequential"   # sequential | parallel
+YOLO_OPTIMIZED_MODEL_CACHE = ""      # 경로 지정 시 최적화된 그래프를 저장 후 재사용 (파일명에 모델·ORT·provider·위 옵션 키 포함)
+YOLO_CLASSES = ["person"]     # 검출할 클래스 (None: COCO 80 클래스 전체)
+YOLO_DRAW_DETECTIONS = True   # False: 박스 렌더링 생략 (검출 결과는 GET /detections/latest)
+YOLO_CSI_GATING = False       # CSI(CADA) 활동이 있을 때만 전체 프레임 추론
+YOLO_GATE_HOLD_OFF = 5.0      # 마지막 활동 이후 전체 프레임 추론을 유지하는 시간 (초)
+YOLO_GATE_KEEPALIVE = 2.0     # 비활성 상태에서의 추론 간격 (초)
+YOLO_OUTPUT_SIZE = (500, 500)  # WebRTC 로 돌려보내는 영상 크기
+YOLO_ADAPTIVE_CONTROL = False  # 추론 지연에 맞춰 입력 해상도·프레임 건너뛰기 자동 조절
+YOLO_LATENCY_BUDGET_MS = 50.0  # 입력 프레임당 목표 추론 비용
+YOLO_INPUT_SCALES = (1.0, 0.75, 0.5)  # 입력 해상도 배율 (공간 축이 동적인 모델만)
+YOLO_MAX_FRAME_SKIP = 4
+YOLO_TRACKING = False         # IoU/Kalman 트래커로 검출 사이 프레임의 박스를 채움 (단일 영상 스트림 기준)
+YOLO_DETECT_INTERVAL = 3      # 트래킹 시 검출기 실행 간격 (프레임)
+YOLO_TRACK_IOU = 0.3
+YOLO_TRACK_MAX_AGE = 30       # 매칭 없이 트랙을 유지하는 프레임 수
+YOLO_TRACK_MIN_HITS = 2       # 트랙을 표시하기 전 필요한 매칭 횟수
+YOLO_ASYNC_INFERENCE = True   # 최신 프레임만 백그라운드 추론 (느릴 때 오래된 프레임은 건너뜀)
+YOLO_BATCH_INFERENCE = False  # 여러 WebRTC 스트림의 프레임을 묶어 한 번에 추론 (사용 시 YOLO_ASYNC_INFERENCE 대신 적용)
+YOLO_MAX_BATCH = 4
+YOLO_BATCH_WAIT_MS = 5.0      # 첫 프레임 이후 다른 스트림 프레임을 기다리는 최대 시간
+
 # Camera settings
 CAMERA_INDEX = 0
 CAMERA_BACKEND = cv2.CAP_DSHOW
@@ -38,4 +66,21 @@ CSI_SUBCARRIERS = 52
 CSI_WINDOW_SIZE = 320
 CSI_STRIDE = 40
 CSI_SMALL_WIN_SIZE = 64
-CSI_FPS_LIMIT = 10
\ No newline at end of file
+CSI_FPS_LIMIT = 10
+CSI_MULTI_TOPIC = False      # 모든 토픽을 하나의 워커에서 (topics, frames, subcarriers) 배치로 처리
+CSI_BACKPRESSURE_POLICY = "drop_newest"  # drop_newest | drop_oldest | coalesce | block | catch_up (block 은 CSI_MQTT_ASYNCIO 단독 사용 불가)
+CSI_MAX_PENDING_WINDOWS = 8
+CSI_PROCESS_POOL_WORKERS = 0  # >0: SlidingCadaProcessor 의 CADA 를 워커 프로세스에서 실행
+CSI_PROCESS_POOL_START_METHOD = "fork"  # spawn/forkserver 는 demo/app.py 를 워커에서 다시 import 함
+CSI_EMIT_MODE = "batch"       # batch: 주기적 cada_batch 일괄 전송 | per_topic: 패킷별 cada_result
+CSI_EMIT_INTERVAL = 0.1       # cada_batch 전송 주기 (초)
+CSI_EMIT_MAX_POINTS = 40      # cada_batch 토픽당 최대 포인트 수
+CSI_RECORD = False            # 파싱된 CSI 를 청크 .npy 파일로 기록 (src/CADA/csi_recorder.py)
+CSI_RECORD_DIR = "recordings"
+CSI_RECORD_CHUNK_FRAMES = 4096
+CSI_RECORD_FLUSH_INTERVAL = 10.0  # 덜 찬 청크도 이 시간(초)이 지나면 기록
+CSI_RECORD_MAX_QUEUE = 64         # 기록 대기 청크 수 상한 (초과 시 청크 버림)
+CSI_MQTT_ASYNCIO = False      # True: MQTT 를 uvicorn 이벤트 루프에서 구동 (네트워크 스레드 없음, 배치 처리, 트리거 발행도 같은 연결)
+CSI_MQTT_MAX_BATCH = 64       # 소켓 읽기 1회당 처리할 최대 패킷 수
+CSI_INGEST_SHARDS = 0         # > 0: 토픽을 해시로 N 개 수신 워커 스레드에 분산 (0: MQTT 콜백에서 바로 처리)
+CSI_INGEST_QUEUE_SIZE = 1024  # 샤드별 대기 메시지 상한 (초과 시 메시지 버림)
\ No newline at end of file
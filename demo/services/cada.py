@@ -1,9 +1,15 @@
 from src.CADA.csi_buffer_utils import RealtimeCSIBufferManager 
-from src.CADA.CADA_process import SlidingCadaProcessor, load_calibration_data
+from src.CADA.CADA_process import SlidingCadaProcessor, MultiTopicCadaProcessor, load_calibration_data
 from demo.utils.mqtt_manager import MQTTManager
+from demo.utils.cada_emitter import CadaBatchEmitter
 from demo.config.settings import (
     CSI_TOPIC, CSI_WINDOW_SIZE, CSI_STRIDE, CSI_SMALL_WIN_SIZE,
-    CSI_SUBCARRIERS, CSI_INDICES_TO_REMOVE, CSI_FPS_LIMIT,
+    CSI_SUBCARRIERS, CSI_INDICES_TO_REMOVE, CSI_FPS_LIMIT, CSI_MULTI_TOPIC,
+    CSI_BACKPRESSURE_POLICY, CSI_MAX_PENDING_WINDOWS,
+    CSI_PROCESS_POOL_WORKERS, CSI_PROCESS_POOL_START_METHOD,
+    CSI_EMIT_MODE, CSI_EMIT_INTERVAL, CSI_EMIT_MAX_POINTS,
+    CSI_RECORD, CSI_RECORD_DIR, CSI_RECORD_CHUNK_FRAMES, CSI_RECORD_FLUSH_INTERVAL, CSI_RECORD_MAX_QUEUE,
+    CSI_MQTT_ASYNCIO, CSI_MQTT_MAX_BATCH, CSI_INGEST_SHARDS, CSI_INGEST_QUEUE_SIZE,
     BROKER_ADDR, BROKER_PORT
 )
 import socketio
@@ -19,6 +25,10 @@ class CADAService:
         self.sio = sio
         self.buf_mgr = None
         self.sliding_processors = {}
+        self.multi_processor = None
+        self.process_pool = None
+        self.emitter = None
+        self.recorder = None
         self.mqtt_manager = None
         self._initialized = False
         
@@ -32,16 +42,51 @@ class CADAService:
         for topic in CSI_TOPIC:
             self.buf_mgr.cada_ewma_states[topic] = 0.0
 
-        self.sliding_processors = {
-            topic: SlidingCadaProcessor(
-                topic=topic,
+        if CSI_MULTI_TOPIC:
+            # 토픽 수와 무관하게 워커 스레드 1개
+            self.multi_processor = MultiTopicCadaProcessor(
+                topics=CSI_TOPIC,
                 buffer_manager=self.buf_mgr,
                 window_size=CSI_WINDOW_SIZE,
                 stride=CSI_STRIDE,
                 small_win_size=CSI_SMALL_WIN_SIZE,
                 threshold_factor=2.5,
-            ) for topic in CSI_TOPIC
-        }
+            )
+            self.sliding_processors = self.multi_processor.ports()
+        else:
+            if CSI_BACKPRESSURE_POLICY == "block" and CSI_MQTT_ASYNCIO and CSI_INGEST_SHARDS == 0:
+                # block 은 MQTT 콜백에서 CADA 완료를 기다림 → asyncio 모드에서는 서버 이벤트 루프가 멈춤
+                raise ValueError("CSI_BACKPRESSURE_POLICY='block' needs CSI_INGEST_SHARDS > 0 when CSI_MQTT_ASYNCIO is on")
+            if CSI_PROCESS_POOL_WORKERS > 0:
+                from src.CADA.cada_process_pool import SharedMemoryCadaPool
+                self.process_pool = SharedMemoryCadaPool(
+                    max_workers=CSI_PROCESS_POOL_WORKERS,
+                    start_method=CSI_PROCESS_POOL_START_METHOD,
+                )
+                # MQTT·기록 스레드 기동 전에 워커를 미리 fork (app 은 모델 로드 전에 initialize 호출)
+                self.process_pool.warmup()
+            self.sliding_processors = {
+                topic: SlidingCadaProcessor(
+                    topic=topic,
+                    buffer_manager=self.buf_mgr,
+                    window_size=CSI_WINDOW_SIZE,
+                    stride=CSI_STRIDE,
+                    small_win_size=CSI_SMALL_WIN_SIZE,
+                    threshold_factor=2.5,
+                    policy=CSI_BACKPRESSURE_POLICY,
+                    max_pending=CSI_MAX_PENDING_WINDOWS,
+                    backend=self.process_pool,
+                ) for topic in CSI_TOPIC
+            }
+
+        if CSI_RECORD:
+            from src.CADA.csi_recorder import CSIRecorder
+            self.recorder = CSIRecorder(
+                CSI_RECORD_DIR,
+                chunk_frames=CSI_RECORD_CHUNK_FRAMES,
+                flush_interval=CSI_RECORD_FLUSH_INTERVAL,
+                max_queue=CSI_RECORD_MAX_QUEUE,
+            )
 
         self.mqtt_manager = MQTTManager(
             sio=self.sio,
@@ -52,19 +97,70 @@ class CADAService:
             indices_to_remove=CSI_INDICES_TO_REMOVE,
             buffer_manager=self.buf_mgr,
             sliding_processors=self.sliding_processors,
-            fps_limit=CSI_FPS_LIMIT
+            fps_limit=CSI_FPS_LIMIT,
+            emit_per_topic=(CSI_EMIT_MODE != "batch"),
+            recorder=self.recorder,
+            asyncio_mode=CSI_MQTT_ASYNCIO,
+            max_batch=CSI_MQTT_MAX_BATCH,
+            shards=CSI_INGEST_SHARDS,
+            shard_queue_size=CSI_INGEST_QUEUE_SIZE,
         )
+
+        if CSI_EMIT_MODE == "batch":
+            self.emitter = CadaBatchEmitter(
+                sio=self.sio,
+                buffer_manager=self.buf_mgr,
+                topics=CSI_TOPIC,
+                interval=CSI_EMIT_INTERVAL,
+                max_points=CSI_EMIT_MAX_POINTS,
+            )
         
         self._initialized = True
         
     def start(self):
+        """Idempotent; in CSI_MQTT_ASYNCIO mode the MQTT connection starts on the first call from the running event loop."""
         if not self._initialized:
             self.initialize()
         if self.mqtt_manager:
             self.mqtt_manager.start()
             
+    def stop(self):
+        """Stops MQTT ingestion, writes out pending CSI recordings and releases the worker pool (call on server shutdown)."""
+        if self.mqtt_manager:
+            self.mqtt_manager.stop()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.process_pool is not None:
+            # 워커 종료 + 공유 메모리 블록 unlink (resource tracker 정리에 맡기지 않음)
+            self.process_pool.close()
+            self.process_pool = None
+
+    def start_emitter(self):
+        """Starts the cada_batch emit loop; call from the running event loop."""
+        if self.emitter is not None:
+            self.emitter.start()
+
     def get_buffer_manager(self):
         return self.buf_mgr
         
     def get_sliding_processors(self):
-        return self.sliding_processors 
\ No newline at end of file
+        return self.sliding_processors
+
+    def is_activity_detected(self) -> bool:
+        """True if the latest CADA activity_flag of any topic is set."""
+        if self.buf_mgr is None:
+            return False
+        for flag_buf in self.buf_mgr.cada_feature_buffers["activity_flag"].values():
+            if len(flag_buf) and flag_buf.view(1)[0] > 0:
+                return True
+        return False
+
+    def get_ingest_stats(self):
+        """MQTT batch / shard queue counters (empty in the default threaded mode)."""
+        return self.mqtt_manager.stats() if self.mqtt_manager else {}
+
+    def get_processor_stats(self):
+        """Window scheduling counters (due/processed/dropped/coalesced) per topic."""
+        if self.multi_processor is not None:
+            return {"*": self.multi_processor.stats()}
+        return {topic: proc.stats() for topic, proc in self.sliding_processors.items()} 
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+cada_emitter.py
+----
+Batched Socket.IO emission of CADA results.
+
+Key Functions
+----
+• CadaBatchEmitter: Collects new CADA points of every topic and emits one `cada_batch` event per tick.
+"""
+
+import asyncio
+import time
+
+import numpy as np
+import socketio
+
+
+class CadaBatchEmitter:
+    """Emits the CADA points produced since the previous tick, for all topics, as one event.
+
+    Runs as a background task on the ASGI event loop, so there is no cross-thread
+    hand-off per packet. Message layout (namespace /csi, event "cada_batch"):
+
+        {
+            "timestamp_ms": server time of the tick,
+            "topics": {
+                topic: {
+                    "ts_ms": [...],                       # packet time (epoch ms) of each point
+                    "activity": [...], "flag": [...],
+                    "threshold": [[index, value], ...]   # only where the value changes
+                }
+            }
+        }
+
+    Thresholds are constant over a stride, so they are sent as change points
+    relative to the last value sent for the topic. Points are read with
+    buffer_manager.cada_points(), so a tick never mixes two strides.
+    """
+
+    def __init__(self, sio: socketio.AsyncServer, buffer_manager, topics: list,
+                 interval: float = 0.1, max_points: int = 40, namespace: str = "/csi"):
+        self.sio = sio
+        self.buffer_manager = buffer_manager
+        self.topics = topics
+        self.interval = interval
+        self.max_points = max_points
+        self.namespace = namespace
+        self._task = None
+        self._last_total = {topic: 0 for topic in topics}
+        self._last_threshold = {}
+
+    def start(self):
+        """Starts the emit loop; must be called from the running event loop (idempotent)."""
+        if self._task is None:
+            self._task = self.sio.start_background_task(self.run)
+        return self._task
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                message = self.collect()
+                if message is not None:
+                    await self.sio.emit("cada_batch", message, namespace=self.namespace)
+            except Exception as e:
+                print(f"ERROR: CadaBatchEmitter emit failed: {e}")
+
+    def collect(self, now_ms: int | None = None):
+        """Builds the next cada_batch message, or None if no topic has new points."""
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+
+        topics = {}
+        for topic in self.topics:
+            total, points = self.buffer_manager.cada_points(topic, self._last_total[topic], self.max_points)
+            self._last_total[topic] = total
+            if points is None:
+                continue
+            ts_ms, activity, flag, threshold = points
+
+            # threshold delta 압축: 직전 전송 값과 달라지는 지점만
+            prev = self._last_threshold.get(topic)
+            changed = np.flatnonzero(np.diff(threshold, prepend=np.nan if prev is None else prev) != 0)
+            self._last_threshold[topic] = float(threshold[-1])
+
+            topics[topic] = {
+                "ts_ms": ts_ms.tolist(),
+                "activity": activity.astype(float).tolist(),
+                "flag": flag.astype(int).tolist(),
+                "threshold": [[int(i), float(threshold[i])] for i in changed],
+            }
+
+        if not topics:
+            return None
+        return {"timestamp_ms": now_ms, "topics": topics}
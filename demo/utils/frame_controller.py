@@ -0,0 +1,115 @@
+"""
+frame_controller.py
+----
+Adaptive frame-skip / resolution control for the video handler.
+
+Key Functions
+----
+• AdaptiveFrameController: Holds per-frame inference cost near a latency budget by lowering
+  the network input resolution and skipping frames, and reports the chosen operating point.
+"""
+
+import threading
+
+
+class AdaptiveFrameController:
+    """Keeps the average inference cost per incoming frame within `budget_ms`.
+
+    The cost is the smoothed inference latency divided by (skip + 1). Above the
+    budget the controller first lowers the input resolution (models with dynamic
+    spatial axes only), then raises the frame skip. It steps back, skip first,
+    once the cost falls below `recover_ratio * budget_ms`. After each change it
+    waits `settle_frames` measurements before deciding again.
+    """
+
+    def __init__(self, model, budget_ms: float = 50.0, scales=(1.0, 0.75, 0.5), max_skip: int = 4,
+                 alpha: float = 0.3, recover_ratio: float = 0.5, settle_frames: int = 5):
+        """
+        Parameters:
+            model : YOLOv10 (its input size is changed through set_input_size())
+            budget_ms : Target inference cost per incoming frame
+            scales : Input resolution scales relative to the initial model input, best first
+            max_skip : Maximum number of frames skipped between inference runs
+            alpha : EWMA factor of the latency estimate
+            recover_ratio : Fraction of the budget under which quality is restored
+            settle_frames : Measurements to wait after an operating-point change
+        """
+        self.model = model
+        self.budget_ms = budget_ms
+        self.max_skip = max_skip
+        self.alpha = alpha
+        self.recover_ratio = recover_ratio
+        self.settle_frames = settle_frames
+
+        base_w, base_h = model.input_width, model.input_height
+        # 네트워크 입력은 32 의 배수
+        sizes = [(max(32, round(base_w * s / 32) * 32), max(32, round(base_h * s / 32) * 32)) for s in scales]
+        self.sizes = list(dict.fromkeys(sizes)) if model.dynamic_input_size else [(base_w, base_h)]
+
+        self._lock = threading.Lock()
+        self.level = 0          # self.sizes 인덱스
+        self.skip = 0
+        self.latency_ms = None  # EWMA
+        self._settle = 0
+        self._frame_count = 0
+        self.frames_processed = 0
+        self.frames_skipped = 0
+
+    def should_process(self) -> bool:
+        """True if this frame should run the detector under the current skip setting."""
+        with self._lock:
+            run = self._frame_count % (self.skip + 1) == 0
+            self._frame_count += 1
+            if run:
+                self.frames_processed += 1
+            else:
+                self.frames_skipped += 1
+            return run
+
+    def record(self, latency_ms: float):
+        """Feeds one measured inference latency and adapts the operating point."""
+        with self._lock:
+            if self.latency_ms is None or self._settle == self.settle_frames:
+                # 동작점 변경 직후 첫 측정으로 재시작
+                self.latency_ms = latency_ms
+            else:
+                self.latency_ms += self.alpha * (latency_ms - self.latency_ms)
+            if self._settle > 0:
+                self._settle -= 1
+                return
+
+            cost = self.latency_ms / (self.skip + 1)
+            if cost > self.budget_ms:
+                if self.level < len(self.sizes) - 1:
+                    self._set_level(self.level + 1)
+                elif self.skip < self.max_skip:
+                    self.skip += 1
+                else:
+                    return
+            elif cost < self.budget_ms * self.recover_ratio:
+                if self.skip > 0:
+                    self.skip -= 1
+                elif self.level > 0:
+                    self._set_level(self.level - 1)
+                else:
+                    return
+            else:
+                return
+            self._settle = self.settle_frames
+
+    def _set_level(self, level):
+        self.level = level
+        self.model.set_input_size(*self.sizes[level])
+
+    def stats(self):
+        with self._lock:
+            width, height = self.sizes[self.level]
+            return {
+                "budget_ms": self.budget_ms,
+                "latency_ms": self.latency_ms,
+                "input_size": [width, height],
+                "resolution_control": len(self.sizes) > 1,
+                "skip": self.skip,
+                "frames_processed": self.frames_processed,
+                "frames_skipped": self.frames_skipped,
+            }
@@ -0,0 +1,61 @@
+"""
+inference_gate.py
+----
+CSI-gated video inference: run YOLO at full rate only while CADA reports activity.
+
+Key Functions
+----
+• InferenceGate: Per-frame run/skip decision with a hold-off after activity and a low-rate keepalive.
+"""
+
+import threading
+import time
+
+
+class InferenceGate:
+    """Decides for each video frame whether the detector should run.
+
+    Frames run while `is_active()` is true and for `hold_off` seconds after it was
+    last true. Otherwise one frame runs every `keepalive_interval` seconds, so
+    the video path keeps working (and shows a fresh frame) even when no sensor
+    reports activity.
+    """
+
+    def __init__(self, is_active, hold_off: float = 5.0, keepalive_interval: float = 2.0):
+        """
+        Parameters:
+            is_active : Callable returning True while any CSI sensor reports activity
+            hold_off : Seconds to keep full-rate inference after the last activity
+            keepalive_interval : Seconds between inference runs while idle (0: every frame)
+        """
+        self.is_active = is_active
+        self.hold_off = hold_off
+        self.keepalive_interval = keepalive_interval
+        self._lock = threading.Lock()
+        self._last_active = float("-inf")
+        self._last_run = float("-inf")
+        self.frames_run = 0
+        self.frames_skipped = 0
+
+    def should_run(self) -> bool:
+        now = time.monotonic()
+        active = self.is_active()
+        with self._lock:
+            if active:
+                self._last_active = now
+            run = (now - self._last_active <= self.hold_off
+                   or now - self._last_run >= self.keepalive_interval)
+            if run:
+                self._last_run = now
+                self.frames_run += 1
+            else:
+                self.frames_skipped += 1
+            return run
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": time.monotonic() - self._last_active <= self.hold_off,
+                "frames_run": self.frames_run,
+                "frames_skipped": self.frames_skipped,
+            }
@@ -0,0 +1,137 @@
+"""
+ingest_shards.py
+----
+Sharded CSI ingestion: topics are assigned to N worker threads so a slow packet of one
+sensor no longer stalls the MQTT callback (and every other sensor) behind it.
+
+Key Functions
+----
+• shard_of function: Stable topic → shard index (topics not known in advance).
+• ShardedIngestor: Per-shard bounded queues + worker threads; each worker owns its topics' state.
+"""
+
+import queue
+import threading
+import time
+import zlib
+
+
+def shard_of(topic: str, n_shards: int) -> int:
+    # 프로세스마다 달라지는 hash() 대신 고정 해시
+    return zlib.crc32(topic.encode()) % n_shards
+
+
+class ShardedIngestor:
+    """Routes (topic, payload) messages to per-shard worker threads.
+
+    A topic always lands on the same shard, so its buffers, SlidingCadaProcessor
+    and recorder staging are only touched by one thread and need no locks. The
+    MQTT callback only does a put_nowait(); a full shard queue drops the message
+    and counts it instead of blocking the other shards. Each worker drains what
+    is queued (up to max_batch) and hands it to batch_handler as one list.
+    """
+
+    def __init__(self, batch_handler, n_shards: int = 4, topics=None, max_queue: int = 1024,
+                 max_batch: int = 64, name: str = "csi-shard"):
+        """
+        Parameters:
+            batch_handler : Called on the shard thread with [(topic, payload), ...] of one shard
+            n_shards : Number of worker threads
+            topics : Known topics, spread evenly over the shards (others are hashed with shard_of)
+            max_queue : Messages waiting per shard before new messages are dropped
+            max_batch : Messages handed to batch_handler per call
+        """
+        self.batch_handler = batch_handler
+        self.n_shards = n_shards
+        self.max_batch = max_batch
+        self._queues = [queue.Queue(maxsize=max_queue) for _ in range(n_shards)]
+        # 설정된 토픽은 균등 배분 (해시만 쓰면 토픽 수가 적을 때 샤드가 치우침)
+        self._routes = {topic: i % n_shards for i, topic in enumerate(topics or ())}
+        self._lock = threading.Lock()   # _routes 추가 / dropped 카운터
+        self._abort = threading.Event()  # close() 제한 시간 초과: 남은 메시지를 버리고 종료
+        self._closed = False
+        self.processed = [0] * n_shards
+        self.dropped = [0] * n_shards
+        self._threads = [
+            threading.Thread(target=self._worker, args=(i,), name=f"{name}-{i}", daemon=True)
+            for i in range(n_shards)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, topic: str, payload):
+        """Non-blocking hand-off from the MQTT callback."""
+        if self._closed:
+            return
+        shard = self._routes.get(topic)
+        if shard is None:
+            with self._lock:
+                shard = self._routes.setdefault(topic, shard_of(topic, self.n_shards))
+        try:
+            self._queues[shard].put_nowait((topic, payload))
+        except queue.Full:
+            with self._lock:
+                self.dropped[shard] += 1
+
+    def submit_batch(self, messages: list):
+        for topic, payload in messages:
+            self.submit(topic, payload)
+
+    def close(self, timeout: float = 5.0):
+        """Stops the workers after the messages already queued are handled.
+
+        Waits at most timeout seconds in total; a shard that cannot take the stop
+        marker in time (queue full behind a stuck or dead worker) is told to
+        abandon its queue, and close() returns without waiting for it further.
+        """
+        self._closed = True  # 이후 submit() 은 무시
+        deadline = time.monotonic() + timeout
+        stuck = []
+        for shard, q in enumerate(self._queues):
+            try:
+                q.put(None, timeout=max(deadline - time.monotonic(), 0.0))
+            except queue.Full:
+                stuck.append(shard)
+        if stuck:
+            self._abort.set()
+        for shard, thread in enumerate(self._threads):
+            thread.join(max(deadline - time.monotonic(), 0.0))
+            if thread.is_alive():
+                print(f"ERROR: ShardedIngestor shard {shard} did not stop within {timeout}s")
+
+    def stats(self) -> dict:
+        with self._lock:
+            dropped = list(self.dropped)
+            routes = dict(self._routes)
+        return {
+            "shards": self.n_shards,
+            "queue_depth": [q.qsize() for q in self._queues],
+            "processed": list(self.processed),
+            "dropped": dropped,
+            "topics": routes,
+        }
+
+    def _worker(self, shard: int):
+        q = self._queues[shard]
+        while True:
+            item = q.get()
+            stop = item is None
+            batch = [] if stop else [item]
+            # 대기 중인 메시지를 한 번에 처리
+            while not stop and len(batch) < self.max_batch:
+                try:
+                    item = q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                try:
+                    self.batch_handler(batch)
+                except Exception as e:
+                    print(f"ERROR: ShardedIngestor shard {shard} failed: {e}")
+                self.processed[shard] += len(batch)
+            if stop or self._abort.is_set():
+                return
@@ -6,14 +6,20 @@ MQTT manager for CSI data processing.
 Key Functions
 ----
 • start_csi_mqtt_thread: Run CSI MQTT client in background thread.
-• MQTTManager: Main class for managing MQTT connections and message handling.
+• AsyncioMQTTClient: One MQTT connection driven by the asyncio event loop, messages delivered in batches.
+• MQTTManager: Main class for managing MQTT connections and message handling (optionally sharded, see ingest_shards.py).
 """
 
 import autorootcwd
 import time
+import select
 import socketio
 import asyncio
-from src.CADA.CADA_process import parse_and_normalize_payload
+import numpy as np
+from src.CADA.CADA_process import (
+    keep_subcarrier_indices, parse_and_normalize_payload, parse_and_normalize_payloads,
+)
+from demo.utils.ingest_shards import ShardedIngestor
 import paho.mqtt.client as paho
 import paho.mqtt.client as mqtt
 import threading
@@ -22,10 +28,12 @@ from demo.config.settings import (
 )
 
 # === MQTT background thread ===
-def start_csi_mqtt_thread(message_handler, topics=None, broker_address=None, broker_port=None, daemon=True):
+def start_csi_mqtt_thread(message_handler, topics=None, broker_address=None, broker_port=None, daemon=True,
+                          decode=True):
     """
     Run CSI MQTT client in background thread.
-    Automatically subscribes to given topics and delivers decoded payload to message_handler.
+    Automatically subscribes to given topics and delivers decoded payload to message_handler
+    (decode=False: the raw payload bytes).
     """
     topics = topics or CSI_TOPICS
     broker_address = broker_address or BROKER_ADDR
@@ -41,7 +49,7 @@ def start_csi_mqtt_thread(message_handler, topics=None, broker_address=None, bro
             print(f"MQTT connection failed. Code: {rc}")
 
     def on_message(client, userdata, msg):
-        message_handler(msg.topic, msg.payload.decode())
+        message_handler(msg.topic, msg.payload.decode() if decode else msg.payload)
 
     client = mqtt.Client()
     client.on_connect = on_connect
@@ -53,26 +61,183 @@ def start_csi_mqtt_thread(message_handler, topics=None, broker_address=None, bro
 
     return thread, client
 
+# === MQTT on the asyncio event loop ===
+class AsyncioMQTTClient:
+    """One paho connection driven by the asyncio event loop instead of a network thread.
+
+    paho's on_socket_* callbacks register the socket with loop.add_reader /
+    add_writer. Each readable event reads every packet already buffered in the
+    kernel (up to max_batch) and hands all messages received to batch_handler
+    as one list of (topic, payload bytes), on the loop thread. publish() from
+    the loop thread is flushed by the same loop, so trigger publishes share
+    the connection. Only the initial TCP connect() blocks.
+    """
+
+    def __init__(self, batch_handler, topics, broker_address, broker_port, loop=None,
+                 max_batch: int = 64, reconnect_delay: float = 2.0):
+        self.batch_handler = batch_handler
+        self.topics = topics
+        self.broker_address = broker_address
+        self.broker_port = broker_port
+        self.loop = loop or asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self.max_batch = max_batch
+        self.reconnect_delay = reconnect_delay
+        self._batch = []
+        self._misc_task = None
+        self._reconnect_task = None
+        self._closing = False
+        self.messages_received = 0
+        self.batches = 0
+        self.largest_batch = 0
+
+        client = mqtt.Client()
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+        client.on_message = self._on_message
+        client.on_socket_open = self._on_socket_open
+        client.on_socket_close = self._on_socket_close
+        client.on_socket_register_write = self._on_socket_register_write
+        client.on_socket_unregister_write = self._on_socket_unregister_write
+        self.client = client
+
+    def connect(self):
+        self.client.connect(self.broker_address, self.broker_port, 60)
+
+    def publish(self, topic: str, payload, qos: int = 0, retain: bool = False):
+        if threading.get_ident() != self._loop_thread:
+            # 소켓 writer 등록은 루프 스레드에서만 (샤드 워커 등에서 호출 시)
+            self.loop.call_soon_threadsafe(self.client.publish, topic, payload, qos, retain)
+            return None
+        return self.client.publish(topic, payload, qos, retain)
+
+    def close(self):
+        self._closing = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self.client.socket() is not None:
+            self.client.disconnect()
+            self.client.loop_write()  # DISCONNECT 전송 후 paho 가 소켓을 닫음
+
+    def stats(self) -> dict:
+        return {
+            "messages_received": self.messages_received,
+            "batches": self.batches,
+            "largest_batch": self.largest_batch,
+        }
+
+    # --- paho callbacks (모두 이벤트 루프 스레드에서 호출) ---
+    def _on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            print("MQTT connected (asyncio).")
+            for topic in self.topics:
+                client.subscribe(topic)
+                print(f"Subscribed to: {topic}")
+        else:
+            print(f"MQTT connection failed. Code: {rc}")
+
+    def _on_disconnect(self, client, userdata, rc):
+        if rc != 0 and not self._closing and self._reconnect_task is None:
+            print(f"MQTT disconnected unexpectedly. Code: {rc}")
+            self._reconnect_task = self.loop.create_task(self._reconnect())
+
+    def _on_message(self, client, userdata, msg):
+        self._batch.append((msg.topic, msg.payload))
+
+    def _on_socket_open(self, client, userdata, sock):
+        self.loop.add_reader(sock, self._on_readable, sock)
+        self._misc_task = self.loop.create_task(self._misc_loop())
+
+    def _on_socket_close(self, client, userdata, sock):
+        self.loop.remove_reader(sock)
+        if self._misc_task is not None:
+            self._misc_task.cancel()
+            self._misc_task = None
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        self.loop.add_writer(sock, client.loop_write)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        self.loop.remove_writer(sock)
+
+    # --- loop side ---
+    def _on_readable(self, sock):
+        for _ in range(self.max_batch):
+            if self.client.loop_read() != mqtt.MQTT_ERR_SUCCESS:
+                break
+            # 커널 버퍼에 남은 데이터가 없으면 이번 배치 종료
+            if self.client.socket() is None or not select.select([sock], [], [], 0)[0]:
+                break
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        self.messages_received += len(batch)
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            self.batch_handler(batch)
+        except Exception as e:
+            print(f"ERROR: MQTT batch handler failed: {e}")
+
+    async def _misc_loop(self):
+        # keepalive PING / 재전송 타이머
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            await asyncio.sleep(1)
+
+    async def _reconnect(self):
+        try:
+            while not self._closing:
+                await asyncio.sleep(self.reconnect_delay)
+                try:
+                    self.client.reconnect()
+                    return
+                except OSError as e:
+                    print(f"MQTT reconnect failed: {e}")
+        finally:
+            self._reconnect_task = None
+
+
 class MQTTManager:
     def __init__(self, sio: socketio.AsyncServer, topics: list, broker_address: str, broker_port: int,
                  subcarriers: int, indices_to_remove: list, buffer_manager, sliding_processors: dict,
-                 fps_limit: int = 10):
+                 fps_limit: int = 10, trigger_client=None, emit_per_topic: bool = True, recorder=None,
+                 asyncio_mode: bool = False, max_batch: int = 64, shards: int = 0,
+                 shard_queue_size: int = 1024):
         self.sio = sio
         self.topics = topics
         self.broker_address = broker_address
         self.broker_port = broker_port
         self.subcarriers = subcarriers
         self.indices_to_remove = indices_to_remove
+        keep_subcarrier_indices(subcarriers, indices_to_remove)  # 잘못된 인덱스는 패킷마다가 아니라 시작 시 ValueError
         self.buffer_manager = buffer_manager
         self.sliding_processors = sliding_processors
         self.fps_limit = fps_limit
+        self.emit_per_topic = emit_per_topic  # False: CadaBatchEmitter 가 주기적으로 일괄 전송
+        self.recorder = recorder  # CSIRecorder (None: 기록 안 함)
+        self.asyncio_mode = asyncio_mode  # True: 이벤트 루프에서 MQTT 구동 (AsyncioMQTTClient)
+        self.max_batch = max_batch
+        self.shards = shards  # > 0: 토픽을 샤드 워커 스레드로 분산 (ShardedIngestor)
+        self.shard_queue_size = shard_queue_size
+        self.ingestor = None
+        self.mqtt_client = None
+        self._csi_thread = None   # 스레드 모드 수신 (start_csi_mqtt_thread)
+        self._csi_client = None
         self._mqtt_started = False
         self.time_last_emit = {}
-        self.trigger_cli = paho.Client()
-        # self.trigger_cli.on_message = self._on_trigger_message
-        self.trigger_cli.connect(broker_address, broker_port, 60)
-        self.trigger_cli.subscribe("ptz/trigger")
-        self.trigger_cli.loop_start()
+        if trigger_client is not None:
+            # 외부 주입 (벤치마크·오프라인 재생 등 브로커 없이 실행할 때)
+            self.trigger_cli = trigger_client
+        elif asyncio_mode:
+            # start() 에서 수신 연결을 트리거 발행에도 사용
+            self.trigger_cli = None
+        else:
+            self.trigger_cli = paho.Client()
+            # self.trigger_cli.on_message = self._on_trigger_message
+            self.trigger_cli.connect(broker_address, broker_port, 60)
+            self.trigger_cli.subscribe("ptz/trigger")
+            self.trigger_cli.loop_start()
+        self._owns_trigger_cli = trigger_client is None and not asyncio_mode
 
       
         # --- NEW: Trigger state management ------------------------
@@ -90,43 +255,120 @@ class MQTTManager:
     def start(self):
         if self._mqtt_started:
             return
+        if self.shards > 0 and self.ingestor is None:
+            self.ingestor = ShardedIngestor(
+                self.mqtt_batch_handler,
+                n_shards=self.shards,
+                topics=self.topics,
+                max_queue=self.shard_queue_size,
+                max_batch=self.max_batch,
+            )
+        if self.asyncio_mode:
+            self._start_asyncio()
+            return
         # FastAPI/uvicorn 이 시작된 뒤에 호출될 가능성이 높으므로 여기서 루프 갱신
         if self.loop is None:
             try:
                 self.loop = asyncio.get_running_loop()
             except RuntimeError:
                 pass
-        start_csi_mqtt_thread(
-            message_handler=self.mqtt_handler,
+        self._csi_thread, self._csi_client = start_csi_mqtt_thread(
+            message_handler=self.ingestor.submit if self.ingestor else self.mqtt_handler,
             topics=self.topics,
             broker_address=self.broker_address,
             broker_port=self.broker_port,
             daemon=True,
+            decode=False,  # 파서가 bytes 를 직접 처리
+        )
+        self._mqtt_started = True
+
+    def _start_asyncio(self):
+        try:
+            self.loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 이벤트 루프 기동 후 (FastAPI startup) 다시 호출됨
+            print("[MQTT] asyncio mode: connection deferred until the event loop is running")
+            return
+        self.mqtt_client = AsyncioMQTTClient(
+            self.ingestor.submit_batch if self.ingestor else self.mqtt_batch_handler,
+            topics=self.topics,
+            broker_address=self.broker_address,
+            broker_port=self.broker_port,
+            loop=self.loop,
+            max_batch=self.max_batch,
         )
+        self.mqtt_client.connect()
+        if self.trigger_cli is None:
+            self.trigger_cli = self.mqtt_client
         self._mqtt_started = True
 
-    def mqtt_handler(self, topic: str, payload: str):
+    def stop(self, timeout: float = 5.0):
+        """Stops every MQTT network loop, then drains the ingest shards; no handler runs after this returns."""
+        if self.mqtt_client is not None:
+            self.mqtt_client.close()
+        if self._csi_client is not None:
+            # loop_forever 는 disconnect 후 반환 → 수신 스레드 종료 대기
+            self._csi_client.disconnect()
+            self._csi_thread.join(timeout)
+            if self._csi_thread.is_alive():
+                print("ERROR: CSI MQTT thread did not stop")
+            self._csi_thread = self._csi_client = None
+        if self._owns_trigger_cli and self.trigger_cli is not None:
+            self.trigger_cli.disconnect()
+            self.trigger_cli.loop_stop()
+        if self.ingestor is not None:
+            self.ingestor.close()
+
+    def stats(self) -> dict:
+        stats = {}
+        if self.mqtt_client is not None:
+            stats["mqtt"] = self.mqtt_client.stats()
+        if self.ingestor is not None:
+            stats["shards"] = self.ingestor.stats()
+        return stats
+
+    def mqtt_handler(self, topic: str, payload: str | bytes):
         # DEBUG: raw MQTT payload preview
         #print("MQTT raw", topic, payload[:60])
-        now = time.time()
-        prev_emit = self.time_last_emit.get(topic, 0.0)
-
         parsed = parse_and_normalize_payload(
             payload, topic, self.subcarriers, self.indices_to_remove,
             self.buffer_manager.mu_bg_dict, self.buffer_manager.sigma_bg_dict)
         if parsed is None:
             return
         amp_z, pkt_time = parsed
-        self.buffer_manager.timestamp_buffer[topic].append(pkt_time)
+        self._ingest(topic, amp_z, pkt_time)
+        self._notify(topic)
+
+    def mqtt_batch_handler(self, messages: list):
+        """[(topic, payload str | bytes), ...] of one socket read (asyncio) or one shard, parsed in one batch."""
+        topics = [topic for topic, _ in messages]
+        payloads = [payload for _, payload in messages]
+        amp_z, packet_times, valid = parse_and_normalize_payloads(
+            payloads, topics, self.subcarriers, self.indices_to_remove,
+            self.buffer_manager.mu_bg_dict, self.buffer_manager.sigma_bg_dict)
+        valid_idx = np.flatnonzero(valid)
+        for i in valid_idx:
+            self._ingest(topics[i], amp_z[i], packet_times[i])
+        # emit / 트리거는 배치당 토픽별 1회
+        for topic in dict.fromkeys(topics[i] for i in valid_idx):
+            self._notify(topic)
+
+    def _ingest(self, topic: str, amp_z, pkt_time):
+        self.buffer_manager.timestamp_buffer[topic].append(pkt_time)  # int epoch ms
         self.sliding_processors[topic].push(amp_z, pkt_time)
+        if self.recorder is not None:
+            self.recorder.record(topic, amp_z, pkt_time)
 
-        if not self.buffer_manager.cada_feature_buffers["activity_detection"][topic]:
+    def _notify(self, topic: str):
+        """Per-topic cada_result emit (fps limited) and PTZ trigger publish."""
+        now = time.time()
+        prev_emit = self.time_last_emit.get(topic, 0.0)
+
+        _, points = self.buffer_manager.cada_points(topic, max_points=1)
+        if points is None:
             return
 
-        idx = -1
-        activity = self.buffer_manager.cada_feature_buffers["activity_detection"][topic][idx]
-        flag = self.buffer_manager.cada_feature_buffers["activity_flag"][topic][idx]
-        threshold = self.buffer_manager.cada_feature_buffers["threshold"][topic][idx]
+        activity, flag, threshold = points[1][-1], points[2][-1], points[3][-1]
         # Plotly 에서 x축을 Date 로 사용하므로, 모듈 내부 타임스탬프 대신
         # 서버 수신 시각(UTC 기반 epoch milliseconds)을 사용한다.
         # ESP/CSI 원본 타임스탬프가 갱신되지 않는 경우 그래프가 수직선으로
@@ -137,8 +379,8 @@ class MQTTManager:
             return
         self.time_last_emit[topic] = now
 
-        if self.loop and self.loop.is_running():
-            asyncio.run_coroutine_threadsafe(
+        if self.emit_per_topic and self.loop and self.loop.is_running():
+            self._schedule(
                 self.sio.emit(
                     "cada_result",
                     {
@@ -150,7 +392,6 @@ class MQTTManager:
                     },
                     namespace="/csi"
                 ),
-                self.loop,
             )
 
         # -------- Trigger publish with hysteresis ----------
@@ -164,6 +405,16 @@ class MQTTManager:
         # emit 직전
         # print("DEBUG emit", topic, float(activity), int(flag))
 
+    def _schedule(self, coro):
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self.loop.create_task(coro)  # 이미 이벤트 루프 스레드 (asyncio 모드)
+        else:
+            asyncio.run_coroutine_threadsafe(coro, self.loop)
+
     # def _on_trigger_message(self, client, userdata, msg):
     #     """브로커로부터 ptz/trigger 메시지를 수신해 내부 상태를 동기화"""
     #     payload = msg.payload.decode().strip()
@@ -7,9 +7,15 @@ Key Functions
 ----
 • z_normalization function: Z-score normalization.
 • filter_normalization function: Outlier removal after normalization.
+• robust_hampel / hampel_filter_2d functions: Per-column and vectorized Hampel filters.
 • realtime_cada_pipeline / cada_pipeline functions: Real-time and offline pipeline functionalities.
 • SlidingCadaProcessor class: Sliding window-based activity detection.
+• cada_pipeline_batch function / MultiTopicCadaProcessor class: CADA vectorized over the topic axis.
+• cada_features_batch function: cada_pipeline_batch stages after the Hampel filter.
 • parse_and_normalize_payload function: MQTT payload parsing and Z-score transformation.
+• parse_and_normalize_payloads function: Vectorized batch parsing of N payloads into one (N, subcarriers) array.
+• parse_timestamp_ms function: ESP timestamp → int epoch ms (cached hour base, no datetime per packet).
+• encode_binary_payload function: Compact binary CSI frame (header + packed int8/int16 I/Q), parsed alongside text.
 """
 
 import autorootcwd
@@ -17,11 +23,31 @@ import os
 import csv
 from scipy.signal import medfilt
 import numpy as np
-from collections import deque
+from numpy.lib.stride_tricks import sliding_window_view
 import re
+import struct
+import time
+import threading
+import warnings
+from collections import deque
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from src.CADA.csi_buffer_utils import RingBuffer
+
+_TIME_RE = re.compile(r"time=(\d{15})")
+_TIME_RE_BYTES = re.compile(rb"time=(\d{15})")
+_CSI_MARKER = "CSI values: "
+_CSI_MARKER_BYTES = _CSI_MARKER.encode()
+
+# 바이너리 CSI 프레임 (little-endian): magic, version, I/Q 형식, YYMMDDhhmmssSSS 정수, 부반송파 수, I/Q 쌍
+# 첫 바이트가 ASCII 가 아니므로 텍스트 페이로드와 섞여 와도 구분된다
+_BINARY_MAGIC = b"\xc5\x1a"
+_BINARY_VERSION = 1
+_BINARY_HEADER = struct.Struct("<2sBBQH")
+_BINARY_DTYPES = {1: np.dtype(np.int8), 2: np.dtype("<i2")}
+WIRE_FORMATS = {"text": None, "binary8": 1, "binary16": 2}
 
 def load_calibration_data(topics, mu_bg_dict, sigma_bg_dict):
     try:
@@ -48,8 +74,54 @@ def load_calibration_data(topics, mu_bg_dict, sigma_bg_dict):
         print(f"Error loading calibration data: {e}")
 
 
+@lru_cache(maxsize=64)
+def _hour_base_ms(yymmddhh: int) -> int:
+    """Epoch milliseconds of the start of a local hour (cached; one miss per sensor-hour)."""
+    rest, hour = divmod(yymmddhh, 100)
+    rest, day = divmod(rest, 100)
+    year, month = divmod(rest, 100)
+    # 시 단위 기준값: 일 단위보다 캐시 미스는 많지만 DST 전환일에도 datetime.timestamp() 와 같음
+    return int(datetime(2000 + year, month, day, hour).timestamp()) * 1000
+
+
+def parse_timestamp_ms(ts) -> int:
+    """
+    Desc:
+        Converts a 15-digit ESP timestamp (YYMMDDhhmmssSSS, int / str / bytes digits) to
+        int epoch milliseconds without building a datetime: the local hour is looked up
+        in a cache and the minutes / seconds / milliseconds are added arithmetically.
+        Same value as int(parse_custom_timestamp(ts).timestamp() * 1000).
+    """
+    hour_key, rest = divmod(int(ts), 10_000_000)
+    # rest = mmssSSS → mm * 60000 + ssSSS (ssSSS 는 그 자체로 밀리초)
+    minute, sec_ms = divmod(rest, 100_000)
+    return _hour_base_ms(hour_key) + minute * 60_000 + sec_ms
+
+
+def now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+def ms_to_datetime(ts_ms) -> datetime:
+    """Local datetime of an epoch-millisecond timestamp (for display / logging only)."""
+    seconds, millisecond = divmod(int(ts_ms), 1000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=millisecond * 1000)
+
+
 def parse_custom_timestamp(ts):
-    """Converts a 15-digit ESP timestamp (YYMMDDhhmmssSSS) to a datetime object."""
+    """Converts a 15-digit ESP timestamp (YYMMDDhhmmssSSS) to a datetime object.
+
+    The ingestion path uses parse_timestamp_ms; this is kept for callers that need a datetime.
+    """
+    if isinstance(ts, (int, np.integer)):
+        # 정수 입력 (bytes 페이로드 경로): 문자열 변환 없이 자릿수 분해
+        rest, millisecond = divmod(int(ts), 1000)
+        rest, second = divmod(rest, 100)
+        rest, minute = divmod(rest, 100)
+        rest, hour = divmod(rest, 100)
+        rest, day = divmod(rest, 100)
+        year, month = divmod(rest, 100)
+        return datetime(2000 + year, month, day, hour, minute, second, millisecond * 1000)
     ts_str = str(ts).zfill(15)
     year = 2000 + int(ts_str[0:2])
     month = int(ts_str[2:4])
@@ -61,43 +133,188 @@ def parse_custom_timestamp(ts):
     microsecond = millisecond * 1000
     return datetime(year, month, day, hour, minute, second, microsecond)
 
-def parse_and_normalize_payload(payload: str,
+@lru_cache(maxsize=32)
+def _keep_indices(subcarriers: int, indices_to_remove: tuple[int, ...]) -> np.ndarray:
+    """Precomputed subcarrier indices kept after noisy-channel removal (replaces np.delete)."""
+    invalid = [i for i in indices_to_remove if not -subcarriers <= i < subcarriers]
+    if invalid:
+        # np.delete 와 같이 범위 밖 인덱스는 오류 (조용히 무시하지 않음)
+        raise ValueError(f"indices_to_remove out of range for {subcarriers} subcarriers: {invalid}")
+    keep = np.ones(subcarriers, dtype=bool)
+    keep[list(indices_to_remove)] = False
+    return np.flatnonzero(keep)
+
+
+def keep_subcarrier_indices(subcarriers: int, indices_to_remove: list[int] | None) -> np.ndarray:
+    """Kept subcarrier indices; raises ValueError for out-of-range indices (validate the config once at startup)."""
+    return _keep_indices(subcarriers, tuple(indices_to_remove or ()))
+
+
+def _fromstring_raises_on_garbage() -> bool:
+    # numpy < 2.x: 잘못된 토큰에서 DeprecationWarning 만 내고 앞부분 배열을 반환
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        try:
+            np.fromstring("1 x", dtype=np.int32, sep=" ")
+        except ValueError:
+            return True
+    return False
+
+
+_FROMSTRING_STRICT = _fromstring_raises_on_garbage()
+# 배치 디코딩에서 페이로드 경계로 끼워 넣는 값 (CSI I/Q 범위 밖)
+_TEXT_BLOCK_SENTINEL = np.iinfo(np.int32).max
+
+
+def _csi_section(payload: str | bytes):
+    """'I Q I Q ...' block after the last CSI marker (whole payload if there is none).
+
+    bytes payloads are searched and sliced as bytes; no str is created.
+    """
+    if isinstance(payload, str):
+        return payload.rpartition(_CSI_MARKER)[2]
+    start = payload.rfind(_CSI_MARKER_BYTES)
+    return payload if start < 0 else payload[start + len(_CSI_MARKER_BYTES):]
+
+
+def _decode_csi_values(payload: str | bytes) -> np.ndarray:
+    # np.fromstring 은 str / bytes 모두 C 레벨에서 바로 정수 배열로 변환 (토큰 리스트 없음)
+    section = _csi_section(payload)
+    values = np.fromstring(section, dtype=np.int32, sep=" ")
+    if not _FROMSTRING_STRICT and values.size != len(section.split()):
+        raise ValueError("malformed CSI values")
+    return values
+
+
+def _decode_text_block(sections: list, width: int):
+    """
+    Desc:
+        Decodes the I/Q sections of several text payloads with one np.fromstring call:
+        the sections are joined with a sentinel value after each of them, and the
+        result is cut at the sentinels.
+    Returns:
+        (values, ok): (len(sections), width) int32 rows, ok marks sections with at least
+        width values. None if the block does not split cleanly (a malformed section,
+        a value equal to the sentinel, or mixed str / bytes); decode one by one then.
+    """
+    if not sections:
+        return np.empty((0, width), dtype=np.int32), np.zeros(0, dtype=bool)
+    sep = f" {_TEXT_BLOCK_SENTINEL} "
+    if all(isinstance(section, bytes) for section in sections):
+        sep = sep.encode()
+    elif not all(isinstance(section, str) for section in sections):
+        return None
+    try:
+        values = np.fromstring(sep.join(sections) + sep, dtype=np.int32, sep=" ")
+    except ValueError:
+        return None
+    # 잘린 배열 (numpy < 2 의 잘못된 토큰) 이면 경계 값 개수가 모자람
+    ends = np.flatnonzero(values == _TEXT_BLOCK_SENTINEL)
+    if ends.size != len(sections):
+        return None
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    lengths = ends - starts
+    ok = lengths >= width
+    if np.all(lengths == lengths[0]):
+        # 흔한 경우: 모든 페이로드의 값 개수가 같음 → reshape 한 번
+        rows = values.reshape(len(sections), lengths[0] + 1)[:, :width]
+        return (rows, ok) if ok[0] else (np.zeros((len(sections), width), dtype=np.int32), ok)
+    rows = np.zeros((len(sections), width), dtype=np.int32)
+    for i in np.flatnonzero(ok):
+        rows[i] = values[starts[i]:starts[i] + width]
+    return rows, ok
+
+
+def encode_binary_payload(timestamp, iq, wire_format: str = "binary8") -> bytes:
+    """
+    Desc:
+        Builds a binary CSI frame (reference encoder for the node side and for replay).
+        Layout: header "<2sBBQH" = magic b"\\xc5\\x1a", version 1, I/Q type (1: int8, 2: int16),
+        timestamp as the YYMMDDhhmmssSSS integer (0: unknown), subcarrier count; then I Q I Q ...
+    Parameters:
+        timestamp : datetime or 15-digit YYMMDDhhmmssSSS integer
+        iq : Interleaved I/Q integers (2 x subcarriers)
+        wire_format : "binary8" or "binary16"
+    """
+    code = WIRE_FORMATS[wire_format]
+    if code is None:
+        raise ValueError(f"Not a binary wire format: {wire_format}")
+    if isinstance(timestamp, datetime):
+        timestamp = int(timestamp.strftime("%y%m%d%H%M%S%f")[:15])
+    dtype = _BINARY_DTYPES[code]
+    info = np.iinfo(dtype)
+    values = np.clip(np.asarray(iq), info.min, info.max).astype(dtype)
+    header = _BINARY_HEADER.pack(_BINARY_MAGIC, _BINARY_VERSION, code, timestamp, values.size // 2)
+    return header + values.tobytes()
+
+
+def _is_binary_payload(payload) -> bool:
+    return not isinstance(payload, str) and payload[:2] == _BINARY_MAGIC
+
+
+def _decode_binary_payload(payload: bytes):
+    """(I/Q array view, packet time in epoch ms) of a binary frame; np.frombuffer, no copy."""
+    _, version, code, timestamp, subcarriers = _BINARY_HEADER.unpack_from(payload)
+    if version != _BINARY_VERSION or code not in _BINARY_DTYPES:
+        raise ValueError(f"unsupported binary CSI frame (version={version}, type={code})")
+    dtype = _BINARY_DTYPES[code]
+    count = min(subcarriers * 2, (len(payload) - _BINARY_HEADER.size) // dtype.itemsize)
+    values = np.frombuffer(payload, dtype=dtype, count=count, offset=_BINARY_HEADER.size)
+    packet_time = parse_timestamp_ms(timestamp) if timestamp else now_ms()
+    return values, packet_time
+
+
+def _decode_payload(payload: str | bytes):
+    """(I/Q integers, packet time in epoch ms) of a text or binary payload (format detected per packet)."""
+    if _is_binary_payload(payload):
+        return _decode_binary_payload(payload)
+    return _decode_csi_values(payload), _parse_packet_time(payload)
+
+
+def _csi_amplitude(csi_values: np.ndarray, subcarriers: int, keep_idx: np.ndarray):
+    """Kept-subcarrier amplitudes of the interleaved I/Q integers, or None if too short."""
+    if csi_values.size < subcarriers * 2:
+        return None  # 데이터 부족
+    iq = csi_values[:subcarriers * 2]
+    # int8/int16/int32 → float64 변환은 hypot 내부에서 (astype 복사 없음)
+    return np.hypot(iq[0::2][keep_idx], iq[1::2][keep_idx], dtype=np.float64)
+
+
+def _parse_packet_time(payload: str | bytes) -> int:
+    """Packet time (epoch ms) from the "time=" field, or the receive time if missing."""
+    match = (_TIME_RE if isinstance(payload, str) else _TIME_RE_BYTES).search(payload)
+    if match:
+        return parse_timestamp_ms(match.group(1))
+    return now_ms()
+
+
+def parse_and_normalize_payload(payload: str | bytes,
                                 topic: str,
                                 subcarriers: int,
                                 indices_to_remove: list[int] | None,
                                 mu_bg_dict: dict,
                                 sigma_bg_dict: dict):
-    """Extracts Z-score normalized amplitude vector and timestamp from MQTT payload string.
+    """Extracts Z-score normalized amplitude vector and timestamp from an MQTT payload.
+
+    payload may be the raw bytes of the MQTT message; it is then parsed without decoding.
+    Binary frames (encode_binary_payload) are recognised by their magic bytes, so text
+    and binary sensors can share one subscription.
 
     Returns:
-        (amp_z, packet_time) or None if parsing fails.
+        (amp_z, packet_time) or None if parsing fails; packet_time is int epoch milliseconds
+        (ms_to_datetime converts it when a datetime is needed).
     """
     try:
-        # 1) 타임스탬프 파싱 ---------------------------------------------------
-        match = re.search(r"time=(\d{15})", payload)
-        if match:
-            ts_str = match.group(1)
-            packet_time = parse_custom_timestamp(ts_str)
-        else:
-            packet_time = datetime.now()
-
-        # 2) CSI 문자열 → 복소수 배열 ------------------------------------------
-        csi_data_str = payload.split("CSI values: ")[-1].strip()
-        csi_values = list(map(int, csi_data_str.split()))
-        if len(csi_values) < subcarriers * 2:
-            return None  # 데이터 부족
+        # 1) 타임스탬프 + I/Q 정수 디코딩 (텍스트 / 바이너리) -------------------
+        csi_values, packet_time = _decode_payload(payload)
 
-        csi_complex = [csi_values[i] + 1j * csi_values[i + 1]
-                       for i in range(0, len(csi_values), 2)]
-        csi_complex = np.array(csi_complex)[:subcarriers]
+        # 2) I/Q → 진폭 (노이즈 채널 제거 포함) ----------------------------------
+        keep_idx = _keep_indices(subcarriers, tuple(indices_to_remove or ()))
+        csi_amplitude = _csi_amplitude(csi_values, subcarriers, keep_idx)
+        if csi_amplitude is None:
+            return None
 
-        # 3) 노이즈 채널 제거 --------------------------------------------------
-        if indices_to_remove:
-            csi_complex = np.delete(csi_complex, indices_to_remove)
-
-        csi_amplitude = np.abs(csi_complex)
-
-        # 4) Z-score 정규화 ----------------------------------------------------
+        # 3) Z-score 정규화 ----------------------------------------------------
         if topic in mu_bg_dict and topic in sigma_bg_dict:
             amp_z = z_normalization(csi_amplitude,
                                     mu_bg_dict[topic],
@@ -110,6 +327,79 @@ def parse_and_normalize_payload(payload: str,
     except Exception as e:
         print(f"ERROR: parse_and_normalize_payload failed for {topic}: {e}")
         return None  
+
+
+def parse_and_normalize_payloads(payloads: list[str | bytes],
+                                 topics: list[str] | str,
+                                 subcarriers: int,
+                                 indices_to_remove: list[int] | None,
+                                 mu_bg_dict: dict,
+                                 sigma_bg_dict: dict):
+    """Batch version of parse_and_normalize_payload.
+
+    Parameters:
+        payloads : N MQTT payloads (str, or raw bytes parsed without decoding; text or binary frames)
+        topics : topic per payload (or a single topic for all of them)
+    Returns:
+        (amp_z, packet_times, valid)
+            amp_z : (N, kept subcarriers) array, rows of invalid payloads are zero
+            packet_times : (N,) int64 epoch milliseconds (0 for invalid payloads)
+            valid : (N,) bool mask of successfully parsed payloads
+    """
+    n = len(payloads)
+    if isinstance(topics, str):
+        topics = [topics] * n
+    keep_idx = _keep_indices(subcarriers, tuple(indices_to_remove or ()))
+    n_keep = keep_idx.size
+
+    # 1) 정수 블록 디코딩 → (N, 2*subcarriers) ----------------------------------
+    width = subcarriers * 2
+    iq = np.zeros((n, width), dtype=np.float64)
+    valid = np.zeros(n, dtype=bool)
+    packet_times = np.zeros(n, dtype=np.int64)
+    # 텍스트 페이로드는 한 번의 np.fromstring 으로 (실패 시 아래에서 하나씩)
+    text_rows = [i for i, payload in enumerate(payloads) if not _is_binary_payload(payload)]
+    block = _decode_text_block([_csi_section(payloads[i]) for i in text_rows], width)
+    if block is not None:
+        iq[text_rows] = block[0]
+        valid[text_rows] = block[1]
+    for i, payload in enumerate(payloads):
+        try:
+            if block is not None and not _is_binary_payload(payload):
+                if valid[i]:
+                    packet_times[i] = _parse_packet_time(payload)
+                continue
+            csi_values, packet_time = _decode_payload(payload)
+            if csi_values.size < width:
+                continue
+            iq[i] = csi_values[:width]
+            packet_times[i] = packet_time
+            valid[i] = True
+        except Exception as e:
+            valid[i] = False
+            iq[i] = 0.0
+            print(f"ERROR: parse_and_normalize_payloads failed for {topics[i]}: {e}")
+
+    # 2) 진폭 + 노이즈 채널 제거 (배치 전체 한 번에) -----------------------------
+    amp = np.hypot(iq[:, 0::2][:, keep_idx], iq[:, 1::2][:, keep_idx])
+
+    # 3) 토픽별 Z-score 정규화 (캘리브레이션 없는 토픽은 생략) ---------------------
+    mu = np.zeros((n, n_keep))
+    sigma = np.ones((n, n_keep))
+    for i, topic in enumerate(topics):
+        if valid[i] and topic in mu_bg_dict and topic in sigma_bg_dict:
+            try:
+                mu[i] = mu_bg_dict[topic]
+                sigma[i] = sigma_bg_dict[topic]
+            except ValueError as e:
+                # 캘리브레이션 길이 불일치: 해당 행만 무효 (배치 전체를 잃지 않음)
+                print(f"ERROR: parse_and_normalize_payloads calibration mismatch for {topic}: {e}")
+                valid[i] = False
+                mu[i], sigma[i], packet_times[i] = 0.0, 1.0, 0
+    amp_z = z_normalization(amp, mu, sigma)
+    amp_z[~valid] = 0.0
+
+    return amp_z, packet_times, valid
     
 
 def z_normalization(amp, mu, sigma ) : 
@@ -163,6 +453,26 @@ def robust_hampel(col, window=5, n_sigma=3):
     col[out] = median[out]
     return col
 
+def hampel_filter_2d(amp, window=5, n_sigma=3):
+    """
+    Desc:
+        Vectorized robust_hampel over every subcarrier column at once (same output).
+        - Time axis is -2; leading axes (e.g. topics) are processed together.
+        - Sliding median uses the same zero padding at the window ends as medfilt.
+    Example:
+        hampel_filtered = hampel_filter_2d(amp_normalized)            # frames x subcarriers
+        hampel_filtered = hampel_filter_2d(windows)                   # topics x frames x subcarriers
+    """
+    half = window // 2
+    pad = [(0, 0)] * amp.ndim
+    pad[-2] = (half, half)
+    neighbours = sliding_window_view(np.pad(amp, pad), window, axis=-2)
+    median = np.partition(neighbours, half, axis=-1)[..., half]
+    dev    = np.abs(amp - median)
+    mad    = np.median(dev, axis=-2, keepdims=True)
+    out    = dev > n_sigma * mad
+    return np.where(out, median, amp)
+
 def detrending_amp(amp, historical_window=100):
     """
     Desc:
@@ -239,7 +549,8 @@ def cada_pipeline(amp_normalized,
                         use_filter_normalization=True,
                         historical_window=100,
                         WIN_SIZE=64,
-                        threshold_factor=2.5):
+                        threshold_factor=2.5,
+                        hampel_impl="vectorized"):
     """
     Desc:
         Function to execute CADA pipeline on Z-score normalized CSI amplitude data.
@@ -250,6 +561,7 @@ def cada_pipeline(amp_normalized,
         historical_window : Frame count used for baseline calculation in detrending
         WIN_SIZE : Moving average filter size
         threshold_factor : Threshold multiplier relative to mean (default: 2.5)
+        hampel_impl : "vectorized" (hampel_filter_2d) or "medfilt" (robust_hampel per column)
     Returns:
         Dictionary:
             'amp_filtered', 'hampel_filtered', 'detrended',
@@ -263,7 +575,10 @@ def cada_pipeline(amp_normalized,
             amp_filtered = amp_normalized
 
         # 2. Hampel 필터 적용
-        hampel_filtered = np.apply_along_axis(robust_hampel, 0, amp_filtered)
+        if hampel_impl == "medfilt":
+            hampel_filtered = np.apply_along_axis(robust_hampel, 0, amp_filtered)
+        else:
+            hampel_filtered = hampel_filter_2d(amp_filtered)
 
         # 3. Detrending
         detrended = detrending_amp(hampel_filtered, historical_window=historical_window)
@@ -298,10 +613,107 @@ def cada_pipeline(amp_normalized,
             'threshold': 0.1
         }
 
+def cada_pipeline_batch(windows,
+                        historical_window=100,
+                        WIN_SIZE=64,
+                        threshold_factor=2.5):
+    """
+    Desc:
+        cada_pipeline (without filter_normalization) vectorized over a leading topic axis.
+        Every stage runs once on the whole stack instead of once per topic.
+    Parameters:
+        windows : Z-score normalized windows (topics x frames x subcarriers)
+        historical_window, WIN_SIZE, threshold_factor : same as cada_pipeline
+    Returns:
+        Dictionary:
+            'feature' (topics x frames-1), 'activity_flag' (topics x frames-1), 'threshold' (topics,)
+    """
+    # 1. Hampel 필터 (토픽·부반송파 전체 동시 적용)
+    hampel_filtered = hampel_filter_2d(windows)
+    return cada_features_batch(hampel_filtered, historical_window, WIN_SIZE, threshold_factor)
+
+def cada_features_batch(hampel_filtered,
+                        historical_window=100,
+                        WIN_SIZE=64,
+                        threshold_factor=2.5):
+    """
+    Desc:
+        Stages after the Hampel filter of cada_pipeline_batch (detrending, motion feature,
+        activity flag), for callers that compute the Hampel filter themselves.
+    Parameters:
+        hampel_filtered : Hampel-filtered windows (topics x frames x subcarriers)
+        historical_window, WIN_SIZE, threshold_factor : same as cada_pipeline
+    Returns:
+        Same dictionary as cada_pipeline_batch
+    """
+    # 2. Detrending (detrending_amp 와 동일한 2단계)
+    detrended_packet = hampel_filtered - np.mean(hampel_filtered, axis=2, keepdims=True)
+    mean_current = np.mean(hampel_filtered, axis=1, keepdims=True)
+    mean_historical = np.mean(hampel_filtered[:, :historical_window], axis=1, keepdims=True)
+    detrended = detrended_packet - (mean_current + mean_historical) / 2
+
+    # 3. 움직임 특징: std → |diff| → WIN_SIZE 이동합 (누적합 차분)
+    std_per_pkt = np.std(detrended, axis=2)
+    feature = np.cumsum(np.abs(np.diff(std_per_pkt, axis=1)), axis=1)
+    feature[:, WIN_SIZE:] -= feature[:, :-WIN_SIZE].copy()
+
+    # 4. 활동 감지 (토픽별 평균 기준)
+    threshold = threshold_factor * np.mean(feature, axis=1)
+    activity_flag = (feature > threshold[:, None]).astype(float)
+
+    return {
+        'feature': feature,
+        'activity_flag': activity_flag,
+        'threshold': threshold,
+    }
+
 # =  CADA 활동 탐지 파이프라인 클래스 ========================================================
 
+def _publish_cada_result(buffer_manager, topic: str, feature: np.ndarray, avg_sig_val: float,
+                         stride: int, threshold_factor: float, ts_window: np.ndarray):
+    """EWMA threshold update and push of the latest stride results to buffer_manager.
+
+    ts_window holds the packet times (epoch ms) of the window frames; feature sample j
+    belongs to frame j + 1, so the pushed tail is stamped with the window's last frames.
+    """
+    # 1. Update EWMA
+    alpha = 0.01
+    prev_ewma = buffer_manager.cada_ewma_states.get(topic, 0.0)
+    ewma_curr = avg_sig_val if prev_ewma == 0.0 else alpha * avg_sig_val + (1 - alpha) * prev_ewma
+    buffer_manager.cada_ewma_states[topic] = ewma_curr
+    Th = threshold_factor * ewma_curr
+    activity_flag = (feature > Th).astype(float)
+
+    # 2. Save results (4 개 링을 한 잠금 안에서 갱신 → CadaBatchEmitter 가 일관된 상태를 읽음)
+    frames_to_push = min(stride, len(feature))
+    buffers = buffer_manager.cada_feature_buffers
+    with buffer_manager.cada_lock:
+        buffers["activity_detection"][topic].extend(feature[-frames_to_push:])
+        buffers["activity_flag"][topic].extend(activity_flag[-frames_to_push:])
+        buffers["threshold"][topic].extend(np.full(frames_to_push, Th))
+        buffer_manager.cada_feature_ts[topic].extend(ts_window[-frames_to_push:])
+
+
+BACKPRESSURE_POLICIES = ("drop_newest", "drop_oldest", "coalesce", "block", "catch_up")
+
+
 class SlidingCadaProcessor:
-    """320-frame sliding window + stride-based CADA batch processing helper class"""
+    """320-frame sliding window + stride-based CADA batch processing helper class
+
+    When a window becomes due while the previous one is still being processed,
+    `policy` decides what happens:
+        drop_newest : discard the new window (legacy behaviour)
+        drop_oldest : queue up to max_pending windows, discarding the oldest queued one
+        coalesce    : keep only the newest window, but publish the features of every
+                      stride it replaces from it so the feature series has no gaps
+        block       : push() waits until the worker is idle
+        catch_up    : queue up to max_pending windows and process all queued windows
+                      in one cada_pipeline_batch call
+    Every discarded / merged window is counted in stats().
+
+    backend (e.g. SharedMemoryCadaPool) moves cada_pipeline into worker processes;
+    window snapshots then live in its shared memory blocks.
+    """
 
     def __init__(self,
                  topic: str,
@@ -310,35 +722,156 @@ class SlidingCadaProcessor:
                  stride: int = 40,
                  small_win_size: int = 64,
                  threshold_factor: float = 2.5,
-                 executor: ThreadPoolExecutor | None = None):
+                 executor: ThreadPoolExecutor | None = None,
+                 policy: str = "drop_newest",
+                 max_pending: int = 8,
+                 backend=None):
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
         self.topic = topic
         self.buffer_manager = buffer_manager
         self.window_size = window_size
         self.stride = stride
         self.small_win_size = small_win_size  # WIN_SIZE for cada_pipeline    
         self.threshold_factor = threshold_factor
+        self.policy = policy
+        self.max_pending = max(1, max_pending)
+        self._max_coalesce = max(1, (window_size - 1) // stride)
 
-        self._buf = deque(maxlen=self.window_size)
-        self._ts_buf = deque(maxlen=self.window_size)
+        self._buf = RingBuffer(self.window_size, item_shape=None)
+        self._ts_buf = RingBuffer(self.window_size, dtype=np.int64)  # epoch ms
         self._counter = 0
-        self._processing_running = False
         self._executor = executor or ThreadPoolExecutor(max_workers=1)
+        self._backend = backend
+
+        # 스케줄러 상태 (모두 _cond 로 보호)
+        self._cond = threading.Condition()
+        self._processing_running = False
+        self._pending = deque()     # [window, ts, strides, shm block | None]
+        self._free_snapshots = []   # 재사용 스냅샷 (window, ts)
+        self.windows_due = 0
+        self.windows_processed = 0
+        self.windows_dropped = 0
+        self.windows_coalesced = 0
+        self.block_wait_s = 0.0
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "policy": self.policy,
+                "windows_due": self.windows_due,
+                "windows_processed": self.windows_processed,
+                "windows_dropped": self.windows_dropped,
+                "windows_coalesced": self.windows_coalesced,
+                "pending": len(self._pending),
+                "block_wait_s": self.block_wait_s,
+            }
 
     def push(self, amp_z: np.ndarray, packet_time):
-        """Adds one frame to buffer and requests asynchronous batch processing if needed."""
-        self._buf.append(amp_z.copy())
+        """Adds one frame (packet_time: int epoch ms) and requests asynchronous batch processing if needed."""
+        self._buf.append(amp_z)
         self._ts_buf.append(packet_time)
         self._counter += 1
 
-        if (len(self._buf) == self.window_size and
-                (self._counter % self.stride == 0) and
-                not self._processing_running):
-            window_copy = np.array(self._buf)
-            ts_copy = list(self._ts_buf)
+        if len(self._buf) == self.window_size and (self._counter % self.stride == 0):
+            self._schedule_window()
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+    def _snapshot(self):
+        """Copies the current window into a recycled buffer (caller holds _cond)."""
+        view = self._buf.view()
+        block = None
+        if self._backend is not None:
+            block, window = self._backend.acquire(view.shape, view.dtype)
+            ts = np.empty(self.window_size, dtype=np.int64)
+        elif self._free_snapshots:
+            window, ts = self._free_snapshots.pop()
+        else:
+            window = np.empty_like(view)
+            ts = np.empty(self.window_size, dtype=np.int64)
+        np.copyto(window, view)
+        np.copyto(ts, self._ts_buf.view())
+        return [window, ts, 1, block]
+
+    def _recycle(self, entries):
+        for window, ts, _, block in entries:
+            if block is not None:
+                self._backend.release(block, window)
+            elif len(self._free_snapshots) <= self.max_pending:
+                self._free_snapshots.append((window, ts))
+
+    def _schedule_window(self):
+        with self._cond:
+            self.windows_due += 1
+            busy = self._processing_running
+
+            if busy and self.policy == "drop_newest":
+                self.windows_dropped += 1
+                return
+            if self.policy == "block":
+                t0 = time.perf_counter()
+                while self._processing_running:
+                    self._cond.wait()
+                self.block_wait_s += time.perf_counter() - t0
+            elif busy and self.policy == "coalesce" and self._pending:
+                # 대기 중 윈도를 최신 윈도로 교체하고, 대신 담당 stride 수를 누적
+                entry = self._pending.pop()
+                strides = entry[2] + 1
+                self._recycle([entry])
+                if strides > self._max_coalesce:
+                    # 한 윈도에서 낼 수 있는 특징 수를 넘는 stride 는 손실로 집계
+                    strides = self._max_coalesce
+                    self.windows_dropped += 1
+                else:
+                    self.windows_coalesced += 1
+                new_entry = self._snapshot()
+                new_entry[2] = strides
+                self._pending.append(new_entry)
+                return
+            elif busy and len(self._pending) >= self.max_pending:
+                # drop_oldest / catch_up: 가장 오래된 대기 윈도 폐기
+                self._recycle([self._pending.popleft()])
+                self.windows_dropped += 1
+
+            self._pending.append(self._snapshot())
+            if self._processing_running:
+                return
             self._processing_running = True
-            self._executor.submit(self._process_window, window_copy, ts_copy)
+        self._executor.submit(self._drain)
+
+    def _drain(self):
+        """Runs in background thread until the pending queue is empty."""
+        while True:
+            with self._cond:
+                if not self._pending:
+                    self._processing_running = False
+                    self._cond.notify_all()
+                    return
+                if self.policy == "catch_up":
+                    batch = list(self._pending)
+                    self._pending.clear()
+                else:
+                    batch = [self._pending.popleft()]
+
+            if self._backend is not None:
+                self._process_remote(batch)
+            elif len(batch) == 1:
+                window, ts, strides, _ = batch[0]
+                self._process_window(window, ts, strides)
+            else:
+                self._process_windows(batch)
 
-    def _process_window(self, csi_window: np.ndarray, ts_window):
+            with self._cond:
+                self.windows_processed += sum(entry[2] for entry in batch)
+                self._recycle(batch)
+                self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # Processing
+    # ------------------------------------------------------------------
+    def _process_window(self, csi_window: np.ndarray, ts_window, strides: int = 1):
         """Runs in background thread: cada_pipeline followed by buffer_manager result push"""
         try:
             # 1. Execute CADA pipeline (only normalized data is input)
@@ -352,28 +885,173 @@ class SlidingCadaProcessor:
 
             feature = results["feature"]
             avg_sig_val = float(np.mean(feature)) if len(feature) > 0 else 0.0
-
-            # 2. Update EWMA
-            alpha = 0.01
-            prev_ewma = self.buffer_manager.cada_ewma_states.get(self.topic, 0.0)
-            ewma_curr = avg_sig_val if prev_ewma == 0.0 else alpha * avg_sig_val + (1 - alpha) * prev_ewma
-            self.buffer_manager.cada_ewma_states[self.topic] = ewma_curr
-            Th = self.threshold_factor * ewma_curr
-            activity_flag = (feature > Th).astype(float)
-
-            # 3. Save results
-            frames_to_push = min(self.stride, len(feature))
-            start_idx = -frames_to_push
-            for i in range(frames_to_push):
-                idx = start_idx + i
-                self.buffer_manager.cada_feature_buffers["activity_detection"][self.topic].append(feature[idx])
-                self.buffer_manager.cada_feature_buffers["activity_flag"][self.topic].append(activity_flag[idx])
-                self.buffer_manager.cada_feature_buffers["threshold"][self.topic].append(Th)
+            self._publish(feature, avg_sig_val, ts_window, strides)
 
         except Exception as e:
             print(f"ERROR: SlidingCadaProcessor window processing failed for {self.topic}: {e}")
-        finally:
-            self._processing_running = False
+
+    def _process_windows(self, batch):
+        """catch_up: all queued windows in one cada_pipeline_batch call, published in order."""
+        try:
+            results = cada_pipeline_batch(
+                np.stack([entry[0] for entry in batch]),
+                historical_window=100,
+                WIN_SIZE=self.small_win_size,
+                threshold_factor=self.threshold_factor,
+            )
+            features = results["feature"]
+            avg_sig_vals = np.mean(features, axis=1)
+            for i, entry in enumerate(batch):
+                self._publish(features[i], float(avg_sig_vals[i]), entry[1], entry[2])
+        except Exception as e:
+            print(f"ERROR: SlidingCadaProcessor catch-up processing failed for {self.topic}: {e}")
+
+    def _process_remote(self, batch):
+        """Process-pool backend: all windows of the batch run in parallel workers, published in order."""
+        futures = [
+            self._backend.submit(entry[3], entry[0], self.stride * entry[2],
+                                 self.small_win_size, self.threshold_factor)
+            for entry in batch
+        ]
+        for entry, future in zip(batch, futures):
+            try:
+                feature, avg_sig_val = future.result()
+                self._publish(feature, avg_sig_val, entry[1], entry[2])
+            except Exception as e:
+                print(f"ERROR: SlidingCadaProcessor worker processing failed for {self.topic}: {e}")
+
+    def _publish(self, feature: np.ndarray, avg_sig_val: float, ts_window: np.ndarray, strides: int = 1):
+        _publish_cada_result(self.buffer_manager, self.topic, feature, avg_sig_val,
+                             self.stride * strides, self.threshold_factor, ts_window)
+
+
+class _TopicPort:
+    """Per-topic push() adapter so callers can treat MultiTopicCadaProcessor like SlidingCadaProcessor."""
+
+    __slots__ = ("_owner", "topic")
+
+    def __init__(self, owner, topic: str):
+        self._owner = owner
+        self.topic = topic
+
+    def push(self, amp_z: np.ndarray, packet_time):
+        self._owner.push(self.topic, amp_z, packet_time)
+
+
+class MultiTopicCadaProcessor:
+    """Sliding-window CADA for many topics sharing a single worker.
+
+    Windows of every topic that reaches a stride boundary are queued; the worker
+    stacks all pending windows into a (topics, frames, subcarriers) tensor and runs
+    cada_pipeline_batch once, then scatters the results into buffer_manager.
+    A newer window of the same topic replaces a pending one that was not yet processed;
+    the replaced strides are then published from the newer window (counted in stats()).
+    """
+
+    def __init__(self,
+                 topics: list[str],
+                 buffer_manager,
+                 window_size: int = 320,
+                 stride: int = 40,
+                 small_win_size: int = 64,
+                 threshold_factor: float = 2.5,
+                 executor: ThreadPoolExecutor | None = None):
+        self.topics = list(topics)
+        self.buffer_manager = buffer_manager
+        self.window_size = window_size
+        self.stride = stride
+        self.small_win_size = small_win_size
+        self.threshold_factor = threshold_factor
+
+        self._buf = {topic: RingBuffer(window_size, item_shape=None) for topic in self.topics}
+        self._ts_buf = {topic: RingBuffer(window_size, dtype=np.int64) for topic in self.topics}  # epoch ms
+        self._counter = {topic: 0 for topic in self.topics}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._processing_running = False
+        self._executor = executor or ThreadPoolExecutor(max_workers=1)
+        self._max_coalesce = max(1, (window_size - 1) // stride)
+        self.windows_due = 0
+        self.windows_processed = 0
+        self.windows_dropped = 0
+        self.windows_coalesced = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "policy": "coalesce",
+                "windows_due": self.windows_due,
+                "windows_processed": self.windows_processed,
+                "windows_dropped": self.windows_dropped,
+                "windows_coalesced": self.windows_coalesced,
+                "pending": len(self._pending),
+            }
+
+    def ports(self) -> dict:
+        """{topic: object with push(amp_z, packet_time)} for MQTTManager."""
+        return {topic: _TopicPort(self, topic) for topic in self.topics}
+
+    def push(self, topic: str, amp_z: np.ndarray, packet_time):
+        """Adds one frame of `topic` and queues its window for the shared worker if due."""
+        buf = self._buf[topic]
+        buf.append(amp_z)
+        self._ts_buf[topic].append(packet_time)
+        self._counter[topic] += 1
+
+        if len(buf) == self.window_size and self._counter[topic] % self.stride == 0:
+            # 대기 중 윈도는 링이 계속 갱신되므로 stride 당 한 번 복사
+            window_copy = buf.view().copy()
+            ts_copy = self._ts_buf[topic].view().copy()
+            with self._lock:
+                self.windows_due += 1
+                strides = 1
+                if topic in self._pending:
+                    strides += self._pending[topic][2]
+                    if strides > self._max_coalesce:
+                        strides = self._max_coalesce
+                        self.windows_dropped += 1
+                    else:
+                        self.windows_coalesced += 1
+                self._pending[topic] = (window_copy, ts_copy, strides)
+                if self._processing_running:
+                    return
+                self._processing_running = True
+            self._executor.submit(self._drain)
+
+    def _drain(self):
+        """Runs in background thread until no windows are pending."""
+        while True:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                if not batch:
+                    self._processing_running = False
+                    return
+            try:
+                self._process_batch(batch)
+            except Exception as e:
+                print(f"ERROR: MultiTopicCadaProcessor batch processing failed for {list(batch)}: {e}")
+            with self._lock:
+                self.windows_processed += sum(entry[2] for entry in batch.values())
+
+    def _process_batch(self, batch: dict):
+        # 부반송파 수가 같은 토픽끼리 묶어 한 번에 처리
+        groups = {}
+        for topic, (window, _, _) in batch.items():
+            groups.setdefault(window.shape, []).append(topic)
+
+        for topics in groups.values():
+            windows = np.stack([batch[topic][0] for topic in topics])
+            results = cada_pipeline_batch(
+                windows,
+                historical_window=100,
+                WIN_SIZE=self.small_win_size,
+                threshold_factor=self.threshold_factor,
+            )
+            features = results["feature"]
+            avg_sig_vals = np.mean(features, axis=1)
+            for i, topic in enumerate(topics):
+                _publish_cada_result(self.buffer_manager, topic, features[i], float(avg_sig_vals[i]),
+                                     self.stride * batch[topic][2], self.threshold_factor, batch[topic][1])
 
 if __name__ == "__main__" : 
     pass
\ No newline at end of file
@@ -0,0 +1,254 @@
+"""
+cada_offline.py
+----
+Offline CADA over CSIRecorder recordings: the windowing of SlidingCadaProcessor replayed
+on memory-mapped chunks, in parallel across topics and time segments.
+
+Output layout (one directory per topic, same names as the recording):
+
+    <out>/<topic>/ts.npy             (n,) int64 packet time (epoch ms) of each feature sample
+    <out>/<topic>/feature.npy        (n,) float32 motion feature
+    <out>/<topic>/activity_flag.npy  (n,) uint8
+    <out>/<topic>/threshold.npy      (n,) float32 EWMA threshold in effect for the sample
+    <out>/run.json                   Parameters and per-topic sample counts
+
+Key Functions
+----
+• run_offline_cada function: Plans window segments per topic, runs them on a process pool, writes the series.
+• _run_segment function: Worker-side CADA on one segment, written straight into the output memmaps.
+• hampel_filter_windows function: hampel_filter_2d of every stride-spaced window, sliding median shared across windows.
+• ewma_thresholds function: Sequential EWMA threshold of _publish_cada_result over per-window feature means.
+
+Usage
+----
+    python -m src.CADA.cada_offline recordings cada_out
+    python -m src.CADA.cada_offline recordings cada_out --topics L0382/ESP/1 --workers 8
+"""
+
+import autorootcwd
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.CADA.CADA_process import cada_features_batch
+from src.CADA.csi_recorder import CSIRecording, topic_dirname
+
+SERIES = ("ts", "feature", "activity_flag", "threshold")
+
+
+def ewma_thresholds(avg_sig_vals: np.ndarray, threshold_factor: float = 2.5, alpha: float = 0.01) -> np.ndarray:
+    """Threshold per window, updated exactly like _publish_cada_result (one update per window)."""
+    thresholds = np.empty(len(avg_sig_vals))
+    ewma = 0.0
+    for i, avg in enumerate(np.asarray(avg_sig_vals, dtype=float).tolist()):
+        ewma = avg if ewma == 0.0 else alpha * avg + (1 - alpha) * ewma
+        thresholds[i] = threshold_factor * ewma
+    return thresholds
+
+
+def hampel_filter_windows(amp: np.ndarray, window_size: int, stride: int, window: int = 5, n_sigma: float = 3):
+    """
+    Desc:
+        hampel_filter_2d of every window amp[k*stride : k*stride+window_size] (same output).
+        Consecutive windows overlap by window_size - stride frames, so the sliding median
+        of the interior rows is computed once per frame instead of once per window; only
+        the zero-padded rows at each window end are recomputed per window.
+    Returns:
+        (windows, frames, subcarriers) Hampel-filtered windows
+    """
+    half = window // 2
+    windows = sliding_window_view(amp, window_size, axis=0)[::stride].transpose(0, 2, 1)
+    n_windows = len(windows)
+
+    # 프레임별 이웃 median (윈도 내부 행은 모든 윈도가 공유)
+    frame_median = np.partition(sliding_window_view(amp, window, axis=0), half, axis=-1)[..., half]
+    median = np.empty(windows.shape, dtype=amp.dtype)
+    median[:, half:window_size - half] = sliding_window_view(
+        frame_median, window_size - 2 * half, axis=0)[::stride][:n_windows].transpose(0, 2, 1)
+
+    # 윈도 양 끝 행: medfilt 와 같은 zero padding 으로 재계산
+    head = np.pad(windows[:, :2 * half], ((0, 0), (half, 0), (0, 0)))
+    tail = np.pad(windows[:, window_size - 2 * half:], ((0, 0), (0, half), (0, 0)))
+    median[:, :half] = np.partition(sliding_window_view(head, window, axis=1), half, axis=-1)[..., half]
+    median[:, window_size - half:] = np.partition(sliding_window_view(tail, window, axis=1), half, axis=-1)[..., half]
+
+    dev = np.abs(windows - median)
+    mad = np.median(dev, axis=1, keepdims=True)
+    return np.where(dev > n_sigma * mad, median, windows)
+
+
+def _first_window_end(window_size: int, stride: int) -> int:
+    # SlidingCadaProcessor: 버퍼가 가득 차고 counter % stride == 0 인 첫 프레임
+    return -(-window_size // stride) * stride
+
+
+def _run_segment(recording_root: str, topic: str, out_dir: str, k0: int, k1: int,
+                 window_size: int, stride: int, WIN_SIZE: int, threshold_factor: float,
+                 batch_windows: int = 64):
+    """Runs in worker process: windows k0..k1-1 of one topic.
+
+    Window k covers frames [end_k - window_size, end_k) with end_k = first end + k * stride,
+    and contributes its last `stride` feature values, as in the online processor.
+
+    Returns:
+        Mean of the full feature series of each window (input of the EWMA threshold)
+    """
+    first_end = _first_window_end(window_size, stride)
+    lo = first_end + k0 * stride - window_size
+    hi = first_end + (k1 - 1) * stride
+    ts, amp = CSIRecording(recording_root).read_frames(topic, lo, hi)
+    if len(amp) != hi - lo:
+        raise ValueError(f"{topic}: expected {hi - lo} frames from {lo}, got {len(amp)}")
+
+    feature_out = np.load(os.path.join(out_dir, "feature.npy"), mmap_mode="r+")
+    ts_out = np.load(os.path.join(out_dir, "ts.npy"), mmap_mode="r+")
+    avg_sig_vals = np.empty(k1 - k0)
+    for b0 in range(0, k1 - k0, batch_windows):
+        b1 = min(b0 + batch_windows, k1 - k0)
+        hampel_filtered = hampel_filter_windows(amp[b0 * stride:(b1 - 1) * stride + window_size],
+                                                window_size, stride)
+        results = cada_features_batch(
+            hampel_filtered,
+            historical_window=100,
+            WIN_SIZE=WIN_SIZE,
+            threshold_factor=threshold_factor,
+        )
+        feature = results["feature"]
+        avg_sig_vals[b0:b1] = np.mean(feature, axis=1)
+        feature_out[(k0 + b0) * stride:(k0 + b1) * stride] = feature[:, -stride:].ravel()
+
+    # 특징 샘플 j 의 시각 = 윈도 끝 stride 프레임의 패킷 시각
+    ts_out[k0 * stride:k1 * stride] = ts[window_size - stride:]
+    feature_out.flush()
+    ts_out.flush()
+    return avg_sig_vals
+
+
+def _create_series(out_dir: str, n: int):
+    os.makedirs(out_dir, exist_ok=True)
+    dtypes = {"ts": np.int64, "feature": np.float32, "activity_flag": np.uint8, "threshold": np.float32}
+    for name in SERIES:
+        series = np.lib.format.open_memmap(os.path.join(out_dir, f"{name}.npy"), mode="w+",
+                                           dtype=dtypes[name], shape=(n,))
+        del series
+
+
+def _write_flags(out_dir: str, thresholds: np.ndarray, stride: int, block_windows: int = 65536):
+    """threshold / activity_flag series from the per-window thresholds, block by block."""
+    feature = np.load(os.path.join(out_dir, "feature.npy"), mmap_mode="r")
+    threshold = np.load(os.path.join(out_dir, "threshold.npy"), mmap_mode="r+")
+    flag = np.load(os.path.join(out_dir, "activity_flag.npy"), mmap_mode="r+")
+    for w0 in range(0, len(thresholds), block_windows):
+        w1 = min(w0 + block_windows, len(thresholds))
+        th = np.repeat(thresholds[w0:w1], stride)
+        sl = slice(w0 * stride, w1 * stride)
+        threshold[sl] = th
+        flag[sl] = feature[sl] > th
+    threshold.flush()
+    flag.flush()
+
+
+def run_offline_cada(recording_root: str,
+                     out_root: str,
+                     topics: list | None = None,
+                     window_size: int = 320,
+                     stride: int = 40,
+                     small_win_size: int = 64,
+                     threshold_factor: float = 2.5,
+                     segment_windows: int = 1024,
+                     max_workers: int | None = None) -> dict:
+    """
+    Desc:
+        Replays the online CADA windowing (window_size / stride, EWMA threshold) over a
+        CSIRecorder directory and writes ts / feature / activity_flag / threshold per topic.
+        Every topic is cut into segments of segment_windows windows; segments of all
+        topics run concurrently on a process pool and write into memory-mapped outputs.
+        The sequential EWMA runs afterwards on the per-window means only.
+    Parameters:
+        recording_root : CSIRecorder directory
+        out_root : Output directory
+        topics : Topic names or directory names (None: every recorded topic)
+        window_size, stride, small_win_size, threshold_factor : same as SlidingCadaProcessor
+        segment_windows : Windows per worker task
+        max_workers : Worker process count (None: os.cpu_count())
+    Returns:
+        Dictionary: topic directory name → number of feature samples written
+    """
+    recording = CSIRecording(recording_root)
+    topics = recording.topics() if topics is None else [topic_dirname(t) for t in topics]
+    first_end = _first_window_end(window_size, stride)
+
+    plans = {}
+    for topic in topics:
+        n_frames = recording.frame_count(topic)
+        n_windows = (n_frames - first_end) // stride + 1 if n_frames >= first_end else 0
+        out_dir = os.path.join(out_root, topic)
+        _create_series(out_dir, n_windows * stride)
+        plans[topic] = (out_dir, n_windows)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            topic: [
+                executor.submit(_run_segment, recording_root, topic, out_dir, k0,
+                                min(k0 + segment_windows, n_windows), window_size, stride,
+                                small_win_size, threshold_factor)
+                for k0 in range(0, n_windows, segment_windows)
+            ]
+            for topic, (out_dir, n_windows) in plans.items()
+        }
+        for topic, topic_futures in futures.items():
+            out_dir = plans[topic][0]
+            avg_sig_vals = np.concatenate([f.result() for f in topic_futures]) if topic_futures else np.empty(0)
+            _write_flags(out_dir, ewma_thresholds(avg_sig_vals, threshold_factor), stride)
+
+    samples = {topic: n_windows * stride for topic, (_, n_windows) in plans.items()}
+    with open(os.path.join(out_root, "run.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "recording": os.path.abspath(recording_root),
+            "window_size": window_size,
+            "stride": stride,
+            "small_win_size": small_win_size,
+            "threshold_factor": threshold_factor,
+            "samples": samples,
+        }, f, indent=2)
+    return samples
+
+
+def load_series(out_root: str, topic: str) -> dict:
+    """Memory-mapped output series of one topic (name → array)."""
+    out_dir = os.path.join(out_root, topic_dirname(topic))
+    return {name: np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode="r") for name in SERIES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline CADA over recorded CSI")
+    parser.add_argument("recording", help="CSIRecorder directory (CSI_RECORD_DIR)")
+    parser.add_argument("out", help="Output directory")
+    parser.add_argument("--topics", default="", help="Comma separated topics (default: all)")
+    parser.add_argument("--window", type=int, default=320)
+    parser.add_argument("--stride", type=int, default=40)
+    parser.add_argument("--small-win", type=int, default=64)
+    parser.add_argument("--threshold-factor", type=float, default=2.5)
+    parser.add_argument("--segment-windows", type=int, default=1024)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    topics = [t for t in args.topics.split(",") if t.strip()] or None
+    t0 = time.perf_counter()
+    samples = run_offline_cada(args.recording, args.out, topics,
+                               window_size=args.window, stride=args.stride,
+                               small_win_size=args.small_win, threshold_factor=args.threshold_factor,
+                               segment_windows=args.segment_windows, max_workers=args.workers)
+    elapsed = time.perf_counter() - t0
+    for topic, n in samples.items():
+        print(f"[cada_offline] {topic}: {n} samples")
+    print(f"[cada_offline] done in {elapsed:.1f}s → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
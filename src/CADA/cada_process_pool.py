@@ -0,0 +1,123 @@
+"""
+cada_process_pool.py
+----
+Process-pool backend for SlidingCadaProcessor: CADA windows run in worker processes,
+outside the GIL shared with uvicorn, the YOLO handler and the paho network loop.
+
+Key Functions
+----
+• SharedMemoryCadaPool class: Hands windows to workers through shared memory blocks (no array pickling).
+• _run_window function: Worker-side cada_pipeline on a shared-memory window.
+"""
+
+import autorootcwd
+import os
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from src.CADA.CADA_process import cada_pipeline
+
+# 워커 프로세스별 공유 메모리 attach 캐시 (블록은 재사용되므로 개수가 제한됨)
+_ATTACHED = {}
+
+
+def _noop():
+    return None
+
+
+def _run_window(name: str, shape: tuple, dtype: str, n_tail: int, WIN_SIZE: int, threshold_factor: float):
+    """Runs in worker process: cada_pipeline on the window stored in shared memory block `name`.
+
+    Returns:
+        (feature[-n_tail:], mean of the full feature series)
+    """
+    shm = _ATTACHED.get(name)
+    if shm is None:
+        shm = SharedMemory(name=name)
+        _ATTACHED[name] = shm
+    window = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    results = cada_pipeline(
+        amp_normalized=window,
+        use_filter_normalization=False,
+        historical_window=100,
+        WIN_SIZE=WIN_SIZE,
+        threshold_factor=threshold_factor,
+    )
+    feature = results["feature"]
+    avg_sig_val = float(np.mean(feature)) if len(feature) > 0 else 0.0
+    return feature[-n_tail:].copy(), avg_sig_val
+
+
+class SharedMemoryCadaPool:
+    """Worker processes + recycled shared memory blocks for CADA windows.
+
+    The processor copies each due window straight into a block from acquire();
+    only the block name and a few scalars cross the process boundary, and only
+    the small feature tail comes back. One pool is shared by all topics.
+    """
+
+    def __init__(self, max_workers: int | None = None, start_method: str | None = None):
+        """
+        Parameters:
+            max_workers : Worker process count (None: os.cpu_count())
+            start_method : multiprocessing start method ("fork", "spawn", ...); with
+                "spawn"/"forkserver" the server entry module must be import-safe
+        """
+        ctx = multiprocessing.get_context(start_method) if start_method else None
+        # 워커가 부모와 같은 resource tracker 를 쓰도록 fork 전에 기동
+        # (워커별 tracker 가 생기면 종료 시 attach 한 블록을 누수로 오인해 unlink 함)
+        resource_tracker.ensure_running()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx)
+        self._lock = threading.Lock()
+        self._free = {}     # (shape, dtype) → [SharedMemory]
+        self._blocks = []
+        self._closed = False
+
+    def warmup(self):
+        """Starts every worker now, before the server spins up its other threads."""
+        wait([self._executor.submit(_noop) for _ in range(self.max_workers)])
+
+    def acquire(self, shape: tuple, dtype=np.float32):
+        """Returns (block, ndarray view of the block) for one window."""
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SharedMemoryCadaPool is closed")
+            free = self._free.setdefault(key, [])
+            shm = free.pop() if free else None
+        if shm is None:
+            nbytes = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            shm = SharedMemory(create=True, size=nbytes)
+            with self._lock:
+                self._blocks.append(shm)
+        return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    def release(self, shm: SharedMemory, window: np.ndarray):
+        key = (window.shape, window.dtype.str)
+        with self._lock:
+            if not self._closed:
+                self._free.setdefault(key, []).append(shm)
+
+    def submit(self, shm: SharedMemory, window: np.ndarray, n_tail: int, WIN_SIZE: int, threshold_factor: float):
+        """Schedules cada_pipeline on `window` (which must live in `shm`); returns a Future."""
+        return self._executor.submit(_run_window, shm.name, window.shape, window.dtype.str,
+                                     n_tail, WIN_SIZE, threshold_factor)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            blocks, self._blocks = self._blocks, []
+            self._free.clear()
+        self._executor.shutdown(wait=True)
+        for shm in blocks:
+            try:
+                shm.close()
+            except BufferError:
+                pass  # 아직 참조 중인 뷰가 있으면 close 는 생략하고 unlink 만 수행
+            shm.unlink()
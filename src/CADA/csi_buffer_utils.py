@@ -5,6 +5,7 @@ Utility module for real-time CSI data processing and buffer management.
 
 Key Functions
 ----
+• RingBuffer class: Preallocated circular buffer with zero-copy windowed views.
 • RealtimeBufferManager class: Real-time CSI feature buffer management.
 • process_realtime_csi function: Real-time MQTT CSI payload processing.
 • extract_cada_features function: CADA feature extraction.
@@ -13,34 +14,124 @@ Key Functions
 """
 
 import autorootcwd
+import threading
 import numpy as np
 from collections import deque
 
 
+class RingBuffer:
+    """Preallocated circular buffer with a deque-like interface and zero-copy windowed views.
+
+    Storage is 2 x capacity and every item is written twice, so the most recent n
+    items are always one contiguous slice of the backing array.
+    """
+
+    def __init__(self, capacity, item_shape=(), dtype=np.float32):
+        """
+        Parameters:
+            capacity : Maximum number of items (same role as deque maxlen)
+            item_shape : Shape of one item; None allocates lazily from the first append
+            dtype : Storage dtype
+        """
+        self.maxlen = capacity
+        self.dtype = np.dtype(dtype)
+        self._data = None
+        self._head = 0  # next write slot
+        self._len = 0
+        self.total = 0  # items ever appended (monotonic, survives clear())
+        if item_shape is not None:
+            self._allocate(tuple(item_shape))
+
+    def _allocate(self, item_shape):
+        self._data = np.zeros((2 * self.maxlen,) + item_shape, dtype=self.dtype)
+
+    @property
+    def item_shape(self):
+        return None if self._data is None else self._data.shape[1:]
+
+    def append(self, item):
+        if self._data is None:
+            self._allocate(np.shape(item))
+        i = self._head
+        self._data[i] = item
+        self._data[i + self.maxlen] = item
+        self._head = (i + 1) % self.maxlen
+        if self._len < self.maxlen:
+            self._len += 1
+        self.total += 1  # 마지막에 갱신: total 을 본 reader 는 이미 기록된 데이터를 읽음
+
+    def extend(self, items):
+        items = np.asarray(items, dtype=self.dtype)
+        k = len(items)
+        if k == 0:
+            return
+        if self._data is None:
+            self._allocate(items.shape[1:])
+        added = k
+        if k > self.maxlen:
+            items = items[-self.maxlen:]
+            k = self.maxlen
+        idx = (self._head + np.arange(k)) % self.maxlen
+        self._data[idx] = items
+        self._data[idx + self.maxlen] = items
+        self._head = (self._head + k) % self.maxlen
+        self._len = min(self.maxlen, self._len + k)
+        self.total += added
+
+    def view(self, n=None):
+        """Zero-copy view of the latest n items (all items if None), oldest first."""
+        if self._data is None:
+            return np.empty((0,), dtype=self.dtype)
+        n = self._len if n is None else min(n, self._len)
+        end = self._head + self.maxlen
+        return self._data[end - n:end]
+
+    def clear(self):
+        self._head = 0
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, idx):
+        return self.view()[idx]
+
+    def __iter__(self):
+        return iter(self.view())
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(self.view(), dtype=dtype)
+
+
 class RealtimeCSIBufferManager:
     """Class to manage all buffers for real-time CSI processing"""
     
-    def __init__(self, topics, buffer_size=512, window_size=64):
+    def __init__(self, topics, buffer_size=512, window_size=64, dtype=np.float32):
         """
         Parameters:
             topics : List of MQTT topics
             buffer_size : Maximum buffer size
             window_size : Window size
+            dtype : Storage dtype of CSI frames and feature series
         """
         self.topics = topics
         self.buffer_size = buffer_size
         self.window_size = window_size
         
-        # Basic buffers
-        self.timestamp_buffer = {topic: deque(maxlen=buffer_size) for topic in topics}
+        # Basic buffers (packet time, int64 epoch milliseconds)
+        self.timestamp_buffer = {topic: RingBuffer(buffer_size, dtype=np.int64) for topic in topics}
         
-        # Buffers for CADA activity detection
-        self.cada_csi_buffers = {topic: deque(maxlen=buffer_size) for topic in topics}
+        # Buffers for CADA activity detection (CSI 프레임 크기는 첫 append 시 결정)
+        self.cada_csi_buffers = {topic: RingBuffer(buffer_size, item_shape=None, dtype=dtype) for topic in topics}
         self.cada_feature_buffers = {
-            'activity_detection': {topic: deque(maxlen=buffer_size) for topic in topics},
-            'activity_flag': {topic: deque(maxlen=buffer_size) for topic in topics},
-            'threshold': {topic: deque(maxlen=buffer_size) for topic in topics}
+            'activity_detection': {topic: RingBuffer(buffer_size, dtype=dtype) for topic in topics},
+            'activity_flag': {topic: RingBuffer(buffer_size, dtype=dtype) for topic in topics},
+            'threshold': {topic: RingBuffer(buffer_size, dtype=dtype) for topic in topics}
         }
+        # 특징 샘플별 패킷 시각 (int64 epoch ms), cada_feature_buffers 와 같은 길이
+        self.cada_feature_ts = {topic: RingBuffer(buffer_size, dtype=np.int64) for topic in topics}
+        # CADA 결과 링 4 개는 이 잠금 안에서 함께 기록 / 읽음 (cada_points)
+        self.cada_lock = threading.Lock()
         
         # CADA state variables
         self.cada_mean_buffers = {topic: deque(maxlen=100) for topic in topics}
@@ -61,14 +152,43 @@ class RealtimeCSIBufferManager:
         
         return combined
     
+    def cada_points(self, topic, since_total=None, max_points=None):
+        """
+        Desc:
+            Consistent copy of the newest CADA points of a topic, taken under cada_lock so
+            activity / flag / threshold / timestamp always belong to the same strides.
+        Parameters:
+            since_total : activity ring total seen by the caller (None: every buffered point)
+            max_points : Upper bound on the number of points returned
+        Returns:
+            (total, points) with points = (ts_ms, activity, flag, threshold) arrays, or None if nothing new
+        """
+        buffers = self.cada_feature_buffers
+        with self.cada_lock:
+            act_buf = buffers["activity_detection"][topic]
+            total = act_buf.total
+            n = len(act_buf) if since_total is None else min(total - since_total, len(act_buf))
+            if max_points is not None:
+                n = min(n, max_points)
+            if n <= 0:
+                return total, None
+            return total, (
+                self.cada_feature_ts[topic].view(n).copy(),
+                act_buf.view(n).copy(),
+                buffers["activity_flag"][topic].view(n).copy(),
+                buffers["threshold"][topic].view(n).copy(),
+            )
+
     def clear_all_buffers(self):
         """Clear all buffers"""
         for topic in self.topics:
             self.timestamp_buffer[topic].clear()
             self.cada_csi_buffers[topic].clear()
             
-            for feat_buffer in self.cada_feature_buffers.values():
-                feat_buffer[topic].clear()
+            with self.cada_lock:
+                for feat_buffer in self.cada_feature_buffers.values():
+                    feat_buffer[topic].clear()
+                self.cada_feature_ts[topic].clear()
             
             self.cada_mean_buffers[topic].clear()
             self.cada_prev_samples[topic] = np.zeros(self.window_size)
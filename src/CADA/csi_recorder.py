@@ -0,0 +1,268 @@
+"""
+csi_recorder.py
+----
+Persistent CSI recording: per-topic chunked .npy files (memory-mappable) with a time index.
+
+Layout (one directory per topic, "/" in topic names replaced by "_"):
+
+    <root>/<topic>/<name>.amp.npy   (n, subcarriers) float32 normalized amplitudes (CADA input)
+    <root>/<topic>/<name>.ts.npy    (n,) int64 packet time, epoch milliseconds
+    <root>/<topic>/index.tsv        name<TAB>t_start_ms<TAB>t_end_ms<TAB>n_frames, one line per chunk
+
+The index is append-only and written by one thread, so its line order is the write
+sequence (= arrival order). Readers keep that order; packet times are only used to
+filter, because a device clock reset or the receive-time fallback can make them go back.
+
+Key Functions
+----
+• CSIRecorder class: Non-blocking record() into per-topic staging chunks + background writer thread
+  (which also hands off partial chunks of topics that went quiet).
+• CSIRecording class: Reader; time-range / frame-range queries over the index, chunks opened with mmap.
+"""
+
+import autorootcwd
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+def topic_dirname(topic: str) -> str:
+    return topic.replace("/", "_")
+
+
+class _Staging:
+    """Chunk being filled for one topic (guarded by CSIRecorder._lock)."""
+
+    __slots__ = ("amp", "ts", "n", "opened")
+
+    def __init__(self, chunk_frames: int, subcarriers: int):
+        self.amp = np.empty((chunk_frames, subcarriers), dtype=np.float32)
+        self.ts = np.empty(chunk_frames, dtype=np.int64)
+        self.n = 0
+        self.opened = time.monotonic()
+
+
+class CSIRecorder:
+    """Appends parsed CSI frames to chunked files without blocking the caller.
+
+    record() only copies one frame into a preallocated staging chunk. Full chunks
+    (or chunks older than flush_interval) go to a bounded queue that a writer
+    thread drains to disk. If the writer falls behind and the queue is full, the
+    chunk is dropped and counted instead of blocking the MQTT callback.
+    The staging area is guarded by one lock, so record() may come from any
+    thread and flush()/close() may run while ingestion is still active; the
+    writer hands off partial chunks older than flush_interval by itself, so a
+    topic that stops sending does not keep its tail in memory.
+    """
+
+    def __init__(self, root: str, chunk_frames: int = 4096, flush_interval: float = 10.0,
+                 max_queue: int = 64):
+        """
+        Parameters:
+            root : Recording directory (created if missing)
+            chunk_frames : Frames per chunk file
+            flush_interval : Age (seconds) after which a partial chunk is handed off (by record() or the writer)
+            max_queue : Chunks waiting for the writer before new chunks are dropped
+        """
+        self.root = root
+        self.chunk_frames = chunk_frames
+        self.flush_interval = flush_interval
+        os.makedirs(root, exist_ok=True)
+
+        self._staging = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self.frames_recorded = 0
+        self.chunks_written = 0
+        self.chunks_dropped = 0
+        self.frames_dropped = 0
+        self._thread = threading.Thread(target=self._writer, name="csi-recorder", daemon=True)
+        self._thread.start()
+
+    def record(self, topic: str, amp: np.ndarray, packet_time):
+        """Stages one frame. packet_time: epoch milliseconds as int (or datetime)."""
+        ts_ms = packet_time if isinstance(packet_time, (int, np.integer)) \
+            else int(round(packet_time.timestamp() * 1000))
+        with self._lock:
+            if self._closed:
+                return
+            staging = self._staging.get(topic)
+            if staging is None or staging.amp.shape[1] != amp.shape[-1]:
+                if staging is not None and staging.n:
+                    self._hand_off(topic, staging)
+                staging = self._staging[topic] = _Staging(self.chunk_frames, amp.shape[-1])
+
+            if staging.n == 0:
+                # 청크 나이는 첫 프레임부터 (비어 있던 시간은 제외)
+                staging.opened = time.monotonic()
+            staging.amp[staging.n] = amp
+            staging.ts[staging.n] = ts_ms
+            staging.n += 1
+            self.frames_recorded += 1
+
+            if staging.n == self.chunk_frames or time.monotonic() - staging.opened >= self.flush_interval:
+                self._hand_off(topic, staging)
+                self._staging[topic] = _Staging(self.chunk_frames, amp.shape[-1])
+
+    def flush(self):
+        """Hands every partial chunk to the writer."""
+        with self._lock:
+            self._flush_locked(max_age=None)
+
+    def close(self):
+        """Flushes staged frames and waits until everything queued is on disk; later record() calls are ignored."""
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked(max_age=None)
+            self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self) -> dict:
+        return {
+            "frames_recorded": self.frames_recorded,
+            "chunks_written": self.chunks_written,
+            "chunks_dropped": self.chunks_dropped,
+            "frames_dropped": self.frames_dropped,
+            "queue_depth": self._queue.qsize(),
+        }
+
+    def _flush_locked(self, max_age):
+        """Hands off partial chunks (only those at least max_age seconds old unless None); holds _lock."""
+        now = time.monotonic()
+        for topic, staging in list(self._staging.items()):
+            if staging.n and (max_age is None or now - staging.opened >= max_age):
+                self._hand_off(topic, staging)
+                self._staging[topic] = _Staging(self.chunk_frames, staging.amp.shape[1])
+
+    def _hand_off(self, topic: str, staging: _Staging):
+        try:
+            self._queue.put_nowait((topic, staging))
+        except queue.Full:
+            # 쓰기 지연: 호출 스레드를 막지 않고 청크를 버림
+            self.chunks_dropped += 1
+            self.frames_dropped += staging.n
+
+    def _writer(self):
+        check_every = self.flush_interval / 2
+        next_check = time.monotonic() + check_every
+        while True:
+            try:
+                item = self._queue.get(timeout=max(next_check - time.monotonic(), 0.0))
+            except queue.Empty:
+                item = ()
+            if time.monotonic() >= next_check:
+                # 조용해진 토픽의 부분 청크는 다음 record() 를 기다리지 않고 넘김
+                with self._lock:
+                    if not self._closed:
+                        self._flush_locked(max_age=self.flush_interval)
+                next_check = time.monotonic() + check_every
+            if item is None:
+                return
+            if not item:
+                continue
+            topic, staging = item
+            try:
+                self._write_chunk(topic, staging)
+                self.chunks_written += 1
+            except OSError as e:
+                print(f"ERROR: CSIRecorder write failed for {topic}: {e}")
+
+    def _write_chunk(self, topic: str, staging: _Staging):
+        directory = os.path.join(self.root, topic_dirname(topic))
+        os.makedirs(directory, exist_ok=True)
+        amp, ts = staging.amp[:staging.n], staging.ts[:staging.n]
+        t_start, t_end = int(ts.min()), int(ts.max())
+
+        name = f"{t_start}"
+        suffix = 1
+        while os.path.exists(os.path.join(directory, f"{name}.ts.npy")):
+            name = f"{t_start}_{suffix}"
+            suffix += 1
+
+        # 데이터 파일을 먼저 쓰고 (임시 이름 → rename) 마지막에 인덱스에 추가
+        for kind, array in (("amp", amp), ("ts", ts)):
+            path = os.path.join(directory, f"{name}.{kind}.npy")
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(path + ".tmp", path)
+        with open(os.path.join(directory, "index.tsv"), "a", encoding="utf-8") as f:
+            f.write(f"{name}\t{t_start}\t{t_end}\t{staging.n}\n")
+
+
+class CSIRecording:
+    """Read access to a CSIRecorder directory."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def topics(self) -> list:
+        """Topic directory names that have an index."""
+        return sorted(
+            d for d in os.listdir(self.root)
+            if os.path.isfile(os.path.join(self.root, d, "index.tsv"))
+        )
+
+    def chunks(self, topic: str, start_ms: int | None = None, end_ms: int | None = None) -> list:
+        """Index entries (name, t_start_ms, t_end_ms, n_frames) overlapping [start_ms, end_ms], in write order."""
+        path = os.path.join(self.root, topic_dirname(topic), "index.tsv")
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 4:
+                    continue
+                name, t0, t1, n = parts[0], int(parts[1]), int(parts[2]), int(parts[3])
+                if (start_ms is None or t1 >= start_ms) and (end_ms is None or t0 <= end_ms):
+                    entries.append((name, t0, t1, n))
+        return entries
+
+    def open_chunk(self, topic: str, name: str):
+        """(ts, amp) of one chunk as read-only memory maps."""
+        base = os.path.join(self.root, topic_dirname(topic), name)
+        return np.load(base + ".ts.npy", mmap_mode="r"), np.load(base + ".amp.npy", mmap_mode="r")
+
+    def iter_chunks(self, topic: str, start_ms: int | None = None, end_ms: int | None = None):
+        """Yields (ts, amp) memory maps of the chunks overlapping the time range, in recording order."""
+        for name, _, _, _ in self.chunks(topic, start_ms, end_ms):
+            yield self.open_chunk(topic, name)
+
+    def frame_count(self, topic: str) -> int:
+        return sum(entry[3] for entry in self.chunks(topic))
+
+    def read_frames(self, topic: str, start: int, stop: int):
+        """(ts, amp) of frames [start, stop), counted in recording order over the whole recording of the topic."""
+        ts_parts, amp_parts = [], []
+        offset = 0
+        for name, _, _, n in self.chunks(topic):
+            lo, hi = max(start - offset, 0), min(stop - offset, n)
+            if lo < hi:
+                ts, amp = self.open_chunk(topic, name)
+                ts_parts.append(ts[lo:hi])
+                amp_parts.append(amp[lo:hi])
+            offset += n
+            if offset >= stop:
+                break
+        if not ts_parts:
+            return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+        return np.concatenate(ts_parts), np.concatenate(amp_parts)
+
+    def read(self, topic: str, start_ms: int | None = None, end_ms: int | None = None):
+        """(ts, amp) of all frames in [start_ms, end_ms], concatenated in recording order."""
+        ts_parts, amp_parts = [], []
+        for ts, amp in self.iter_chunks(topic, start_ms, end_ms):
+            mask = np.ones(len(ts), dtype=bool)
+            if start_ms is not None:
+                mask &= ts >= start_ms
+            if end_ms is not None:
+                mask &= ts <= end_ms
+            ts_parts.append(ts[mask])
+            amp_parts.append(amp[mask])
+        if not ts_parts:
+            return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+        return np.concatenate(ts_parts), np.concatenate(amp_parts)
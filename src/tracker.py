@@ -0,0 +1,215 @@
+"""
+tracker.py
+----
+Lightweight multi-object tracker on top of YOLOv10 detections (IoU association + Kalman filter).
+
+Key Functions
+----
+• IoUKalmanTracker class: Constant-velocity Kalman tracks with persistent IDs; update() on detector
+  frames, predict() on frames the detector skips.
+• Tracks class: Track IDs / boxes / scores / class ids of one frame.
+• draw_tracks function: Draws tracked boxes with their IDs.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+from src.utils import class_names, colors, compute_iou, draw_box, draw_text
+
+
+class Tracks(NamedTuple):
+    """Active tracks of one frame (same coordinates as the detections fed to the tracker)."""
+    ids: np.ndarray        # (N,) int
+    boxes: np.ndarray      # (N, 4) float32 x1, y1, x2, y2
+    scores: np.ndarray     # (N,) float32, score of the last matched detection
+    class_ids: np.ndarray  # (N,) int
+
+
+def _xyxy_to_cxcywh(boxes):
+    wh = boxes[:, 2:4] - boxes[:, 0:2]
+    return np.concatenate([boxes[:, 0:2] + wh / 2, wh], axis=1)
+
+
+def _cxcywh_to_xyxy(boxes):
+    half = boxes[:, 2:4] / 2
+    return np.concatenate([boxes[:, 0:2] - half, boxes[:, 0:2] + half], axis=1)
+
+
+class IoUKalmanTracker:
+    """Tracks detections across frames with persistent IDs.
+
+    Each track is a constant-velocity Kalman filter on (cx, cy, w, h). The process
+    and measurement noise scale with the box size, as in DeepSORT, so the tracker
+    works in pixels or in normalized coordinates. Detections are assigned to the
+    predicted tracks greedily by IoU (compute_iou), within the same class only.
+    Every call to update() or predict() advances the tracks by one frame, so the
+    detector can run every K frames while predict() fills the frames in between.
+    """
+
+    _STD_POSITION = 1.0 / 20
+    _STD_VELOCITY = 1.0 / 160
+
+    def __init__(self, iou_threshold: float = 0.3, max_age: int = 30, min_hits: int = 2):
+        """
+        Parameters:
+            iou_threshold : Minimum IoU between a predicted track and a detection to match
+            max_age : Frames a track survives without a matching detection
+            min_hits : Matched detections needed before a track is reported
+        """
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self._next_id = 1
+
+        # 상수 속도 모델: x' = x + v
+        self._F = np.eye(8)
+        self._F[:4, 4:] = np.eye(4)
+
+        self._mean = np.empty((0, 8))
+        self._cov = np.empty((0, 8, 8))
+        self._ids = np.empty(0, dtype=int)
+        self._class_ids = np.empty(0, dtype=int)
+        self._scores = np.empty(0, dtype=np.float32)
+        self._hits = np.empty(0, dtype=int)
+        self._since_update = np.empty(0, dtype=int)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def predict(self) -> Tracks:
+        """Advances all tracks one frame without detections (detector skipped this frame)."""
+        self._predict()
+        self._prune()
+        return self.tracks()
+
+    def update(self, detections) -> Tracks:
+        """Advances one frame and corrects the tracks with this frame's detections.
+
+        Parameters:
+            detections : (boxes (N, 4) xyxy, scores (N,), class_ids (N,)), e.g. YOLOv10.detect()
+        """
+        det_boxes, det_scores, det_class_ids = detections
+        det_boxes = np.asarray(det_boxes, dtype=np.float64).reshape(-1, 4)
+        det_scores = np.asarray(det_scores, dtype=np.float32)
+        det_class_ids = np.asarray(det_class_ids, dtype=int)
+
+        self._predict()
+        track_idx, det_idx = self._associate(det_boxes, det_class_ids)
+        if len(track_idx):
+            self._correct(track_idx, _xyxy_to_cxcywh(det_boxes[det_idx]))
+            self._scores[track_idx] = det_scores[det_idx]
+            self._class_ids[track_idx] = det_class_ids[det_idx]
+            self._hits[track_idx] += 1
+            self._since_update[track_idx] = 0
+
+        unmatched = np.setdiff1d(np.arange(len(det_boxes)), det_idx)
+        if len(unmatched):
+            self._add(det_boxes[unmatched], det_scores[unmatched], det_class_ids[unmatched])
+        self._prune()
+        return self.tracks()
+
+    def tracks(self) -> Tracks:
+        """Confirmed tracks (at least min_hits matches) at their current estimate."""
+        shown = self._hits >= self.min_hits
+        boxes = _cxcywh_to_xyxy(self._mean[shown, :4]).astype(np.float32)
+        return Tracks(self._ids[shown], boxes, self._scores[shown], self._class_ids[shown])
+
+    def reset(self):
+        self.__init__(self.iou_threshold, self.max_age, self.min_hits)
+
+    # ------------------------------------------------------------------
+    # Kalman filter (모든 트랙을 한 번에 계산)
+    # ------------------------------------------------------------------
+    def _noise_scale(self, size):
+        # (w, h, w, h) 순서의 박스 크기 비례 표준편차
+        return np.concatenate([size, size], axis=1)
+
+    def _predict(self):
+        if not len(self._ids):
+            return
+        scale = self._noise_scale(self._mean[:, 2:4])
+        q = np.concatenate([self._STD_POSITION * scale, self._STD_VELOCITY * scale], axis=1) ** 2
+        self._mean = self._mean @ self._F.T
+        self._cov = self._F @ self._cov @ self._F.T
+        self._cov[:, np.arange(8), np.arange(8)] += q
+        self._since_update += 1
+
+    def _correct(self, idx, measurements):
+        mean, cov = self._mean[idx], self._cov[idx]
+        r = (self._STD_POSITION * self._noise_scale(mean[:, 2:4])) ** 2
+        s = cov[:, :4, :4].copy()
+        s[:, np.arange(4), np.arange(4)] += r
+        # K = P Hᵀ S⁻¹ (S 는 대칭)
+        gain = np.linalg.solve(s, cov[:, :4, :]).transpose(0, 2, 1)
+        innovation = measurements - mean[:, :4]
+        self._mean[idx] = mean + np.einsum("nij,nj->ni", gain, innovation)
+        self._cov[idx] = cov - gain @ cov[:, :4, :]
+
+    def _add(self, boxes, scores, class_ids):
+        n = len(boxes)
+        mean = np.zeros((n, 8))
+        mean[:, :4] = _xyxy_to_cxcywh(boxes)
+        scale = self._noise_scale(mean[:, 2:4])
+        var = np.concatenate([2 * self._STD_POSITION * scale, 10 * self._STD_VELOCITY * scale], axis=1) ** 2
+        cov = np.zeros((n, 8, 8))
+        cov[:, np.arange(8), np.arange(8)] = var
+
+        ids = np.arange(self._next_id, self._next_id + n)
+        self._next_id += n
+        self._mean = np.concatenate([self._mean, mean])
+        self._cov = np.concatenate([self._cov, cov])
+        self._ids = np.concatenate([self._ids, ids])
+        self._class_ids = np.concatenate([self._class_ids, class_ids])
+        self._scores = np.concatenate([self._scores, scores])
+        self._hits = np.concatenate([self._hits, np.ones(n, dtype=int)])
+        self._since_update = np.concatenate([self._since_update, np.zeros(n, dtype=int)])
+
+    def _prune(self):
+        # 크기가 0 이하로 예측된 트랙도 제거
+        keep = (self._since_update <= self.max_age) & np.all(self._mean[:, 2:4] > 0, axis=1)
+        if keep.all():
+            return
+        self._mean, self._cov = self._mean[keep], self._cov[keep]
+        self._ids, self._class_ids = self._ids[keep], self._class_ids[keep]
+        self._scores, self._hits = self._scores[keep], self._hits[keep]
+        self._since_update = self._since_update[keep]
+
+    def _associate(self, det_boxes, det_class_ids):
+        """Greedy IoU assignment of detections to predicted tracks; returns (track_idx, det_idx)."""
+        n_tracks, n_dets = len(self._ids), len(det_boxes)
+        if n_tracks == 0 or n_dets == 0:
+            return np.empty(0, dtype=int), np.empty(0, dtype=int)
+
+        track_boxes = _cxcywh_to_xyxy(self._mean[:, :4])
+        iou = np.stack([compute_iou(box, det_boxes) for box in track_boxes])
+        iou[self._class_ids[:, None] != det_class_ids[None, :]] = 0.0
+        iou = np.nan_to_num(iou)
+
+        track_idx, det_idx = [], []
+        used_tracks = np.zeros(n_tracks, dtype=bool)
+        used_dets = np.zeros(n_dets, dtype=bool)
+        for flat in np.argsort(-iou, axis=None):
+            t, d = divmod(int(flat), n_dets)
+            if iou[t, d] < self.iou_threshold:
+                break
+            if used_tracks[t] or used_dets[d]:
+                continue
+            used_tracks[t] = used_dets[d] = True
+            track_idx.append(t)
+            det_idx.append(d)
+        return np.array(track_idx, dtype=int), np.array(det_idx, dtype=int)
+
+
+def draw_tracks(image, tracks: Tracks):
+    """Draws tracked boxes in place, labelled with class, track ID and score."""
+    img_height, img_width = image.shape[:2]
+    font_size = min([img_height, img_width]) * 0.0006
+    text_thickness = int(min([img_height, img_width]) * 0.001)
+
+    for track_id, box, score, class_id in zip(*tracks):
+        color = colors[class_id]
+        draw_box(image, box, color)  # type: ignore
+        caption = f"{class_names[class_id]} #{track_id} {int(score * 100)}%"
+        draw_text(image, caption, box, color, font_size, text_thickness)  # type: ignore
+    return image
@@ -1,7 +1,14 @@
+import hashlib
+import os
+
 import cv2
 import numpy as np
 import onnxruntime
+import threading
 import time
+from collections import deque
+from concurrent.futures import Future
+from typing import NamedTuple
 
 class_names = [
     "person",
@@ -86,25 +93,79 @@ class_names = [
     "toothbrush",
 ]
 
+class Detections(NamedTuple):
+    """Detections of one frame, in original image coordinates."""
+    boxes: np.ndarray      # (N, 4) float32 x1, y1, x2, y2
+    scores: np.ndarray     # (N,) float32
+    class_ids: np.ndarray  # (N,) int
+
+
+def _tensor_size(input_tensor):
+    """(width, height) of an (N, 3, H, W) input tensor."""
+    return input_tensor.shape[3], input_tensor.shape[2]
+
+
 class YOLOv10:
-    def __init__(self, path):
+    def __init__(self, path, session_options=None, optimized_model_path=None, classes=None):
+        """
+        Parameters:
+            path : ONNX model file (FP32 or INT8-quantized)
+            session_options : onnxruntime.SessionOptions (see create_session_options)
+            optimized_model_path : Cache file for the optimized graph; the actual file name carries a key of
+                the source model, ORT version, providers and session options, so changing any of them rebuilds it
+            classes : Class names or ids to keep (None: all 80 COCO classes)
+        """
+        self.classes = None if classes is None else np.array(
+            [class_names.index(c) if isinstance(c, str) else int(c) for c in classes]
+        )
+        # 스레드별 재사용 입력/출력 버퍼 (fastrtc 핸들러가 여러 스레드에서 호출될 수 있음)
+        self._local = threading.local()
         # Initialize model
-        self.initialize_model(path)
+        self.initialize_model(path, session_options, optimized_model_path)
 
     def __call__(self, image):
         return self.detect_objects(image)
 
-    def initialize_model(self, path):
+    def initialize_model(self, path, session_options=None, optimized_model_path=None):
         # Try GPU first then CPU
         available = onnxruntime.get_available_providers()
         preferred = ["CUDAExecutionProvider", "CPUExecutionProvider"]
         providers = [p for p in preferred if p in available]
         print(f"[YOLOv10] Using ONNX providers: {providers}")
-        self.session = onnxruntime.InferenceSession(path, providers=providers)
+
+        if optimized_model_path:
+            # 호출자의 SessionOptions 는 건드리지 않음 (캐시용 설정은 복사본에)
+            session_options = _copy_session_options(session_options)
+            path = self._optimized_model_cache(path, optimized_model_path, session_options, providers)
+        self.session = onnxruntime.InferenceSession(path, sess_options=session_options, providers=providers)
         # Get model info
         self.get_input_details()
         self.get_output_details()
 
+    @staticmethod
+    def _optimized_model_cache(path, optimized_model_path, session_options, providers):
+        """Returns the cached optimized graph for path (building it first if needed) and adjusts
+        session_options so loading it does not optimize again."""
+        level = session_options.graph_optimization_level
+        enable_all = level == onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        cache_file = _optimized_model_file(optimized_model_path, path, session_options, providers)
+        if os.path.exists(cache_file):
+            print(f"[YOLOv10] Loading optimized model cache: {cache_file}")
+        else:
+            # ORT_ENABLE_ALL 의 레이아웃 변환은 하드웨어 종속 → 파일에는 extended 까지만 저장
+            save_options = _copy_session_options(session_options)
+            if enable_all:
+                save_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+            root, ext = os.path.splitext(cache_file)
+            save_options.optimized_model_filepath = f"{root}.tmp{ext}"
+            onnxruntime.InferenceSession(path, sess_options=save_options, providers=providers)
+            os.replace(save_options.optimized_model_filepath, cache_file)
+            print(f"[YOLOv10] Saved optimized model cache: {cache_file}")
+        if not enable_all:
+            # 캐시에 이미 요청 단계까지 적용됨; all 이면 남은 (하드웨어별) 단계만 로드 시 실행
+            session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+        return cache_file
+
     def detect_objects(self, image, conf_threshold=0.3):
         input_tensor = self.prepare_input(image)
 
@@ -113,73 +174,181 @@ class YOLOv10:
 
         return new_image
 
-    def prepare_input(self, image):
-        self.img_height, self.img_width = image.shape[:2]
-
-        input_img = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-
-        # Resize input image
-        input_img = cv2.resize(input_img, (self.input_width, self.input_height))
+    def detect(self, image, conf_threshold=0.3):
+        """Like detect_objects() without drawing: returns Detections."""
+        input_tensor = self.prepare_input(image)
+        return Detections(*self.process_output(
+            self.run(input_tensor), conf_threshold, image.shape[:2], _tensor_size(input_tensor)))
+
+    def detect_objects_batch(self, images, conf_thresholds):
+        """Runs one session.run over several frames; returns the annotated frames in order."""
+        return [
+            self.draw_detections(image, *detections)
+            for image, detections in zip(images, self.detect_batch(images, conf_thresholds))
+        ]
+
+    def detect_batch(self, images, conf_thresholds):
+        """Batched detect(): one session.run over several frames; returns Detections in order."""
+        if self.batch_size is not None and len(images) > self.batch_size:
+            # 고정 배치 모델: batch_size 단위로 나눠 실행
+            results = []
+            for k in range(0, len(images), self.batch_size):
+                results.extend(self.detect_batch(
+                    images[k:k + self.batch_size], conf_thresholds[k:k + self.batch_size]))
+            return results
+
+        input_tensor = self.prepare_input_batch(images)
+        outputs = self.run(input_tensor)
+        input_size = _tensor_size(input_tensor)
+        return [
+            Detections(*self.process_output([outputs[0][i]], conf_thresholds[i], image.shape[:2], input_size))
+            for i, image in enumerate(images)
+        ]
+
+    def prepare_input_batch(self, images):
+        batch = self.batch_size or len(images)
+        width, height = self.input_size
+        input_tensor = self._buffers(batch, height, width)["input"]
+        for i, image in enumerate(images):
+            self.fill_input(image, input_tensor[i])
+        # 고정 배치 모델은 남는 슬롯을 0 으로 채움
+        input_tensor[len(images):] = 0
+        return input_tensor
 
-        # Scale input pixel values to 0 to 1
-        input_img = input_img / 255.0
-        input_img = input_img.transpose(2, 0, 1)
-        input_tensor = input_img[np.newaxis, :, :, :].astype(np.float32)
+    def prepare_input(self, image):
+        """(1, 3, H, W) input tensor of the current input size; its shape is what process_output rescales from."""
+        width, height = self.input_size
+        input_tensor = self._buffers(1, height, width)["input"]
+        self.fill_input(image, input_tensor[0])
 
         return input_tensor
 
+    def fill_input(self, image, out):
+        """Writes one BGR frame into a (3, H, W) float32 slot: RGB order, 0 to 1 scale."""
+        height, width = out.shape[1:]
+        if image.shape[:2] != (height, width):
+            resized = self._resize_buffer(height, width) if image.dtype == np.uint8 else None
+            image = cv2.resize(image, (width, height), dst=resized)
+
+        # BGR→RGB, /255, HWC→CHW 를 채널별로 출력 슬롯에 직접 기록 (중간 이미지 없음)
+        for c in range(3):
+            np.divide(image[:, :, 2 - c], np.float32(255.0), out=out[c])
+        return out
+
+    def run(self, input_tensor):
+        """Runs the session; preallocated input tensors go through their IO binding."""
+        batch, _, height, width = input_tensor.shape
+        buffers = self._buffers(batch, height, width)
+        if input_tensor is not buffers["input"]:
+            return self.session.run(
+                self.output_names, {self.input_names[0]: input_tensor}
+            )
+
+        binding = buffers["binding"]
+        self.session.run_with_iobinding(binding)
+        if buffers["outputs"] is not None:
+            return buffers["outputs"]
+        return binding.copy_outputs_to_cpu()
+
+    def _buffers(self, batch, height, width):
+        key = (batch, height, width)
+        cache = getattr(self._local, "buffers", None)
+        if cache is None:
+            cache = self._local.buffers = {}
+        buffers = cache.get(key)
+        if buffers is None:
+            buffers = cache[key] = self._create_buffers(*key)
+        return buffers
+
+    def _resize_buffer(self, height, width):
+        """Per-thread uint8 scratch frame for cv2.resize (separate from the batch buffer sets)."""
+        cache = getattr(self._local, "resized", None)
+        if cache is None:
+            cache = self._local.resized = {}
+        resized = cache.get((height, width))
+        if resized is None:
+            resized = cache[(height, width)] = np.empty((height, width, 3), dtype=np.uint8)
+        return resized
+
+    def _create_buffers(self, batch, height, width):
+        input_tensor = np.zeros((batch, 3, height, width), dtype=np.float32)
+        binding = self.session.io_binding()
+        binding.bind_cpu_input(self.input_names[0], input_tensor)
+
+        # 출력 shape 가 배치 축 외에 모두 고정이면 미리 할당한 배열에 바로 받음 (출력 복사 없음)
+        outputs = []
+        for output in self.session.get_outputs():
+            shape = [batch] + list(output.shape[1:])
+            if output.type != "tensor(float)" or not all(isinstance(d, int) for d in shape):
+                outputs = None
+                break
+            outputs.append(np.empty(shape, dtype=np.float32))
+        for i, name in enumerate(self.output_names):
+            if outputs is None:
+                binding.bind_output(name)
+            else:
+                binding.bind_output(name, "cpu", 0, np.float32, outputs[i].shape, outputs[i].ctypes.data)
+
+        return {
+            "input": input_tensor,
+            "binding": binding,
+            "outputs": outputs,
+        }
+
     def inference(self, image, input_tensor, conf_threshold=0.3):
         start = time.perf_counter()
-        outputs = self.session.run(
-            self.output_names, {self.input_names[0]: input_tensor}
-        )
+        outputs = self.run(input_tensor)
         (
             boxes,
             scores,
             class_ids, 
-        ) = self.process_output(outputs, conf_threshold)
+        ) = self.process_output(outputs, conf_threshold, image.shape[:2], _tensor_size(input_tensor))
         return self.draw_detections(image, boxes, scores, class_ids)
 
-    def process_output(self, output, conf_threshold=0.3):
+    def process_output(self, output, conf_threshold, image_shape, input_size):
+        """
+        Parameters:
+            image_shape : (height, width) of the source image the boxes are scaled to
+            input_size : (width, height) of the network input the output was computed on
+        """
         predictions = np.squeeze(output[0])
 
         # Filter out object confidence scores below threshold
+        # (클래스 필터도 박스 rescale 전에 같은 마스크로 적용)
+        keep = predictions[:, 4] > conf_threshold
+        if self.classes is not None:
+            keep &= np.isin(predictions[:, 5].astype(int), self.classes)
+        predictions = predictions[keep, :]
         scores = predictions[:, 4]
-        predictions = predictions[scores > conf_threshold, :]
-        scores = scores[scores > conf_threshold]
-
-        if len(scores) == 0:
-            return [], [], []
 
         # Get the class with the highest confidence
         class_ids = predictions[:, 5].astype(int)
 
         # Get bounding boxes for each object
-        boxes = self.extract_boxes(predictions)
+        boxes = self.extract_boxes(predictions, image_shape, input_size)
 
         return boxes, scores, class_ids
 
-    def extract_boxes(self, predictions):
+    def extract_boxes(self, predictions, image_shape, input_size):
         # Extract boxes from predictions
         boxes = predictions[:, :4]
 
         # Scale boxes to original image dimensions
-        boxes = self.rescale_boxes(boxes)
+        boxes = self.rescale_boxes(boxes, image_shape, input_size)
 
         # Convert boxes to xyxy format
         # boxes = xywh2xyxy(boxes)
 
         return boxes
 
-    def rescale_boxes(self, boxes):
+    def rescale_boxes(self, boxes, image_shape, input_size):
         # Rescale boxes to original image dimensions
-        input_shape = np.array(
-            [self.input_width, self.input_height, self.input_width, self.input_height]
-        )
+        # (크기는 인자로 받음: 여러 스레드가 같은 모델을 다른 크기로 호출할 수 있음)
+        img_height, img_width = image_shape
+        input_width, input_height = input_size
+        input_shape = np.array([input_width, input_height, input_width, input_height])
         boxes = np.divide(boxes, input_shape, dtype=np.float32)
-        boxes *= np.array(
-            [self.img_width, self.img_height, self.img_width, self.img_height]
-        )
+        boxes *= np.array([img_width, img_height, img_width, img_height])
         return boxes
 
     def draw_detections(
@@ -192,53 +361,424 @@ class YOLOv10:
         self.input_names = [model_inputs[i].name for i in range(len(model_inputs))]
 
         self.input_shape = model_inputs[0].shape
-        self.input_height = self.input_shape[2]
-        self.input_width = self.input_shape[3]
+        # 배치 축이 정수면 고정 배치 모델 (None: 동적 배치)
+        self.batch_size = self.input_shape[0] if isinstance(self.input_shape[0], int) else None
+        # 공간 축이 동적이면 640 에서 시작, set_input_size() 로 변경 가능
+        self.dynamic_input_size = not all(isinstance(d, int) for d in self.input_shape[2:4])
+        # (width, height) 튜플 하나로 보관 → 다른 스레드의 set_input_size() 와 섞이지 않음
+        self.input_size = (
+            self.input_shape[3] if isinstance(self.input_shape[3], int) else 640,
+            self.input_shape[2] if isinstance(self.input_shape[2], int) else 640,
+        )
+
+    @property
+    def input_width(self):
+        return self.input_size[0]
+
+    @property
+    def input_height(self):
+        return self.input_size[1]
+
+    def set_input_size(self, width, height):
+        """Changes the network input resolution (models with dynamic spatial axes only).
+
+        Calls already past prepare_input keep the size they started with.
+        """
+        if (width, height) == self.input_size:
+            return
+        if not self.dynamic_input_size:
+            raise ValueError(f"model input size is fixed at {self.input_width}x{self.input_height}")
+        self.input_size = (width, height)
 
     def get_output_details(self):
         model_outputs = self.session.get_outputs()
         self.output_names = [model_outputs[i].name for i in range(len(model_outputs))]
 
+_GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+_EXECUTION_MODES = {
+    "sequential": onnxruntime.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": onnxruntime.ExecutionMode.ORT_PARALLEL,
+}
+
+
+# SessionOptions 는 복사(pickle)를 지원하지 않으므로 이 속성들을 새 객체로 옮김
+_SESSION_OPTION_FIELDS = (
+    "intra_op_num_threads", "inter_op_num_threads", "graph_optimization_level", "execution_mode",
+    "execution_order", "enable_cpu_mem_arena", "enable_mem_pattern", "enable_mem_reuse",
+    "use_deterministic_compute", "log_severity_level", "log_verbosity_level",
+)
+
+
+def _copy_session_options(options):
+    """New SessionOptions with the fields of options (session config entries are not carried over)."""
+    copied = onnxruntime.SessionOptions()
+    if options is not None:
+        for field in _SESSION_OPTION_FIELDS:
+            setattr(copied, field, getattr(options, field))
+    return copied
+
+
+def _optimized_model_file(optimized_model_path, path, options, providers):
+    """Cache file name keyed by the source model and everything that shapes the optimized graph."""
+    stat = os.stat(path)
+    key = repr((
+        os.path.abspath(path), stat.st_mtime_ns, stat.st_size, onnxruntime.__version__, list(providers),
+        str(options.graph_optimization_level), str(options.execution_mode),
+        options.intra_op_num_threads, options.inter_op_num_threads,
+    ))
+    root, ext = os.path.splitext(optimized_model_path)
+    return f"{root}.{hashlib.sha1(key.encode()).hexdigest()[:12]}{ext or '.onnx'}"
+
+
+def create_session_options(intra_op_threads=0, inter_op_threads=0,
+                           graph_optimization="all", execution_mode="sequential"):
+    """Builds onnxruntime.SessionOptions (0 threads keeps the ORT default)."""
+    if graph_optimization not in _GRAPH_OPTIMIZATION_LEVELS:
+        raise ValueError(f"unknown graph_optimization: {graph_optimization!r} "
+                         f"(expected one of {list(_GRAPH_OPTIMIZATION_LEVELS)})")
+    if execution_mode not in _EXECUTION_MODES:
+        raise ValueError(f"unknown execution_mode: {execution_mode!r} "
+                         f"(expected one of {list(_EXECUTION_MODES)})")
+
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    options.graph_optimization_level = _GRAPH_OPTIMIZATION_LEVELS[graph_optimization]
+    options.execution_mode = _EXECUTION_MODES[execution_mode]
+    return options
+
+class LatestFrameInference:
+    """Runs a YOLOv10 model in a background thread, always on the newest submitted frame.
+
+    submit() replaces any frame still waiting (counted as skipped), so latency stays
+    bounded to about one inference even when frames arrive faster than the model runs.
+    latest() returns the most recent annotated result immediately
+    (Detections instead of an annotated frame when draw=False).
+    """
+
+    def __init__(self, model, name="yolo-inference", draw=True):
+        self.model = model
+        self._detect = model.detect_objects if draw else model.detect
+        self._cond = threading.Condition()
+        self._pending = None  # (frame, conf_threshold)
+        self._result = None
+        self._running = True
+        self.frames_submitted = 0
+        self.frames_processed = 0
+        self.frames_skipped = 0
+        self.last_latency_ms = 0.0
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def __call__(self, frame, conf_threshold=0.3):
+        self.submit(frame, conf_threshold)
+        return self.latest()
+
+    def submit(self, frame, conf_threshold=0.3):
+        with self._cond:
+            if self._pending is not None:
+                self.frames_skipped += 1
+            self._pending = (frame, conf_threshold)
+            self.frames_submitted += 1
+            self._cond.notify()
+
+    def latest(self):
+        """Most recent result (None until the first inference finishes)."""
+        with self._cond:
+            return self._result
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queue_depth": 0 if self._pending is None else 1,
+                "frames_submitted": self.frames_submitted,
+                "frames_processed": self.frames_processed,
+                "frames_skipped": self.frames_skipped,
+                "last_latency_ms": self.last_latency_ms,
+            }
+
+    def latency_sample(self):
+        """(frames_processed, last_latency_ms) read together; the count changes once per new result."""
+        with self._cond:
+            return self.frames_processed, self.last_latency_ms
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None and self._running:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                frame, conf_threshold = self._pending
+                self._pending = None
+
+            start = time.perf_counter()
+            try:
+                result = self._detect(frame, conf_threshold)
+            except Exception as e:
+                print(f"[YOLOv10] inference failed: {e}")
+                continue
+
+            with self._cond:
+                self._result = result
+                self.frames_processed += 1
+                self.last_latency_ms = (time.perf_counter() - start) * 1000
+
+class BatchedInferenceServer:
+    """Gathers detect_objects() calls from several streams into one batched session.run.
+
+    Each caller blocks on its own frame. The server thread waits up to max_wait_ms
+    after the first queued frame for others to arrive, runs up to max_batch frames
+    in a single (N, 3, H, W) inference and hands each caller its own result.
+    Models with a static batch axis of 1 fall back to one frame per run.
+    With draw=False callers get Detections instead of annotated frames.
+    """
+
+    def __init__(self, model, max_batch=4, max_wait_ms=5.0, name="yolo-batch", draw=True):
+        self.model = model
+        self._detect_batch = model.detect_objects_batch if draw else model.detect_batch
+        if model.batch_size is not None:
+            max_batch = min(max_batch, model.batch_size)
+            print(f"[YOLOv10] static batch axis ({model.batch_size}), max_batch={max_batch}")
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self._cond = threading.Condition()
+        self._queue = deque()  # (frame, conf_threshold, Future)
+        self._running = True
+        self.batches = 0
+        self.frames_processed = 0
+        self.last_batch_size = 0
+        self.last_latency_ms = 0.0
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def input_width(self):
+        return self.model.input_width
+
+    @property
+    def input_height(self):
+        return self.model.input_height
+
+    def submit(self, frame, conf_threshold=0.3):
+        """Queues one frame; the returned Future resolves to that frame's result."""
+        future = Future()
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("BatchedInferenceServer is closed")
+            self._queue.append((frame, conf_threshold, future))
+            self._cond.notify()
+        return future
+
+    def detect_objects(self, frame, conf_threshold=0.3):
+        return self.submit(frame, conf_threshold).result()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queue_depth": len(self._queue),
+                "batches": self.batches,
+                "frames_processed": self.frames_processed,
+                "mean_batch_size": self.frames_processed / self.batches if self.batches else 0.0,
+                "last_batch_size": self.last_batch_size,
+                "last_latency_ms": self.last_latency_ms,
+            }
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join()
+        while self._queue:
+            self._queue.popleft()[2].set_exception(RuntimeError("BatchedInferenceServer is closed"))
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._queue and self._running:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                # 첫 프레임 도착 후 max_wait 동안 다른 스트림의 프레임을 모음
+                deadline = time.monotonic() + self.max_wait
+                while len(self._queue) < self.max_batch and self._running:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+
+            frames, conf_thresholds, futures = zip(*batch)
+            start = time.perf_counter()
+            try:
+                results = self._detect_batch(list(frames), list(conf_thresholds))
+            except Exception as e:
+                print(f"[YOLOv10] batched inference failed: {e}")
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            with self._cond:
+                self.batches += 1
+                self.frames_processed += len(batch)
+                self.last_batch_size = len(batch)
+                self.last_latency_ms = (time.perf_counter() - start) * 1000
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
 # Create a list of colors for each class where each color is a tuple of 3 integer values
 rng = np.random.default_rng(3)
 colors = rng.uniform(0, 255, size=(len(class_names), 3))
 
 
 def nms(boxes, scores, iou_threshold):
-    # Sort by score
-    sorted_indices = np.argsort(scores)[::-1]
-
-    keep_boxes = []
-    while sorted_indices.size > 0:
-        # Pick the last box
-        box_id = sorted_indices[0]
-        keep_boxes.append(box_id)
-
-        # Compute IoU of the picked box with the rest
-        ious = compute_iou(boxes[box_id, :], boxes[sorted_indices[1:], :])
-
-        # Remove boxes with IoU over the threshold
-        keep_indices = np.where(ious < iou_threshold)[0]
-
-        # print(keep_indices.shape, sorted_indices.shape)
-        sorted_indices = sorted_indices[keep_indices + 1]
-
-    return keep_boxes
+    """Greedy NMS; returns kept indices in descending score order (equal scores: higher index first)."""
+    order = _score_order(scores)
+    return order[_greedy_keep(np.asarray(boxes)[order], iou_threshold)].tolist()
 
 
 def multiclass_nms(boxes, scores, class_ids, iou_threshold):
-    unique_class_ids = np.unique(class_ids)
+    """Per-class NMS; kept indices grouped by ascending class id, descending score within a class."""
+    class_ids = np.asarray(class_ids)
+    if len(np.unique(class_ids)) <= 1:
+        return nms(boxes, scores, iou_threshold)
+    keep = batched_nms(boxes, scores, iou_threshold, class_ids=class_ids)
+    return keep[np.argsort(class_ids[keep], kind="stable")].tolist()
+
+
+def _score_order(scores):
+    # 안정 정렬의 역순: 동점은 인덱스가 큰 쪽이 먼저 (클래스별로 나눠 정렬해도 같은 순서)
+    return np.argsort(scores, kind="stable")[::-1]
+
+
+def _greedy_keep(sorted_boxes, iou_threshold):
+    """Positions kept by the per-box greedy loop over boxes already in score order."""
+    remaining = np.arange(len(sorted_boxes))
+    keep = []
+    while remaining.size > 0:
+        box_id = remaining[0]
+        keep.append(box_id)
+        ious = compute_iou(sorted_boxes[box_id], sorted_boxes[remaining[1:]])
+        remaining = remaining[1:][ious < iou_threshold]
+    return np.asarray(keep, dtype=int)
+
+
+def batched_nms(boxes, scores, iou_threshold, class_ids=None, image_ids=None):
+    """Vectorized greedy NMS over several classes and images at once.
+
+    Keeps the same boxes as nms() run separately on every (image, class) group:
+    a box is dropped when a higher-scored kept box of its group has
+    IoU >= iou_threshold with it. Candidate pairs come from one sweep over x
+    coordinates shifted by a per-group offset (the class-offset trick), so only
+    boxes that overlap in x within the same group are compared. IoU values are
+    computed on the original coordinates. The greedy keep set is then found with
+    the Cluster-NMS fixed point over those pairs, without looping over boxes.
+
+    A single group (e.g. one class in one image) goes through the per-box loop
+    instead: with hundreds of mutually overlapping boxes the fixed point needs
+    many passes and the loop is faster.
+
+    Parameters:
+        boxes : (N, 4) x1, y1, x2, y2 (flatten (B, N, 4) batches and pass image_ids)
+        scores : (N,)
+        class_ids, image_ids : (N,) group labels, None = one group
+
+    Returns:
+        kept indices (int ndarray) in descending score order; equal scores keep the
+        higher index first, the order nms() gives within each group
+    """
+    boxes = np.asarray(boxes)
+    scores = np.asarray(scores)
+    n = len(scores)
+    if n == 0:
+        return np.empty(0, dtype=int)
+
+    order = _score_order(scores)
+    sorted_boxes = boxes[order]
+    group = np.zeros(n, dtype=np.int64)
+    for labels in (class_ids, image_ids):
+        if labels is not None:
+            _, inverse = np.unique(np.asarray(labels)[order], return_inverse=True)
+            group = group * (inverse.max() + 1) + inverse.reshape(-1)
+    if not group.any():
+        return order[_greedy_keep(sorted_boxes, iou_threshold)]
+
+    degenerate = np.any(sorted_boxes[:, 2:4] <= sorted_boxes[:, 0:2])
+    if degenerate or iou_threshold <= 0:
+        # 면적 0 박스(IoU NaN)나 임계값 0 이하는 겹치지 않는 쌍도 억제 → 전체 행렬로 계산
+        src, dst = np.nonzero(np.triu(
+            ~(box_iou(sorted_boxes[:, None], sorted_boxes[None, :]) < iou_threshold)
+            & (group[:, None] == group[None, :]), k=1))
+    else:
+        src, dst = _overlapping_pairs(sorted_boxes, group)
+        suppress = ~(box_iou(sorted_boxes[src], sorted_boxes[dst]) < iou_threshold)
+        src, dst = src[suppress], dst[suppress]
+        # 점수가 더 높은 쪽(정렬 인덱스가 작은 쪽)이 억제
+        src, dst = np.minimum(src, dst), np.maximum(src, dst)
+
+    # 유지된 박스의 억제만 반영하며 반복 → 수렴 결과가 greedy NMS 와 같음
+    keep = np.ones(n, dtype=bool)
+    for _ in range(n):
+        new_keep = np.ones(n, dtype=bool)
+        new_keep[dst[keep[src]]] = False
+        if np.array_equal(new_keep, keep):
+            break
+        keep = new_keep
+    return order[keep]
+
+
+def _overlapping_pairs(boxes, group):
+    """Index pairs (i, j) of boxes in the same group that overlap (positive intersection)."""
+    # 그룹별로 x 좌표를 이동시켜 다른 그룹끼리는 절대 겹치지 않게 함
+    span = float(boxes[:, 2].max()) - float(boxes[:, 0].min()) + 1.0
+    x1 = boxes[:, 0].astype(np.float64) + group * span
+    x2 = boxes[:, 2].astype(np.float64) + group * span
+
+    # x1 순으로 정렬하면 박스 p 와 x 범위가 겹치는 뒤쪽 박스는 p+1 .. last-1 구간
+    n = len(boxes)
+    by_x1 = np.argsort(x1, kind="stable").astype(np.int32)
+    position = np.arange(n, dtype=np.int32)
+    last = np.searchsorted(x1[by_x1], x2[by_x1], side="left").astype(np.int32)
+    counts = np.maximum(last - position - 1, 0)
+
+    a = np.repeat(position, counts)
+    shift = np.cumsum(counts, dtype=np.int64) - counts - position - 1
+    b = np.arange(len(a), dtype=np.int64) - shift[a]
+    i, j = by_x1[a], by_x1[b]
+
+    # y 범위도 겹치는 쌍만 남김 (IoU 계산 대상 축소)
+    y1 = np.ascontiguousarray(boxes[:, 1])
+    y2 = np.ascontiguousarray(boxes[:, 3])
+    overlap = (y1.take(i) < y2.take(j)) & (y1.take(j) < y2.take(i))
+    return i[overlap], j[overlap]
+
+
+def box_iou(boxes_a, boxes_b):
+    """Element-wise IoU of broadcastable (..., 4) box arrays (same arithmetic as compute_iou)."""
+    xmin = np.maximum(boxes_a[..., 0], boxes_b[..., 0])
+    ymin = np.maximum(boxes_a[..., 1], boxes_b[..., 1])
+    xmax = np.minimum(boxes_a[..., 2], boxes_b[..., 2])
+    ymax = np.minimum(boxes_a[..., 3], boxes_b[..., 3])
 
-    keep_boxes = []
-    for class_id in unique_class_ids:
-        class_indices = np.where(class_ids == class_id)[0]
-        class_boxes = boxes[class_indices, :]
-        class_scores = scores[class_indices]
+    intersection_area = np.maximum(0, xmax - xmin) * np.maximum(0, ymax - ymin)
 
-        class_keep_boxes = nms(class_boxes, class_scores, iou_threshold)
-        keep_boxes.extend(class_indices[class_keep_boxes])
+    area_a = (boxes_a[..., 2] - boxes_a[..., 0]) * (boxes_a[..., 3] - boxes_a[..., 1])
+    area_b = (boxes_b[..., 2] - boxes_b[..., 0]) * (boxes_b[..., 3] - boxes_b[..., 1])
+    union_area = area_a + area_b - intersection_area
 
-    return keep_boxes
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return intersection_area / union_area
 
 
 def compute_iou(box, boxes):
@@ -0,0 +1,86 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.CADA.CADA_process import SlidingCadaProcessor, cada_pipeline
+from src.CADA.csi_buffer_utils import RealtimeCSIBufferManager
+
+TOPIC = "L0382/ESP/1"
+WINDOW, STRIDE, WIN_SIZE = 320, 40, 64
+N_WINDOWS = 8  # 대기 7 개: coalesce 한도((320-1)//40) 와 max_pending 이내
+
+
+def _run(policy, max_pending=8):
+    """Pushes N_WINDOWS windows while the worker is held on the first one, then releases it."""
+    rng = np.random.default_rng(1)
+    amp = rng.normal(size=(WINDOW + (N_WINDOWS - 1) * STRIDE, 41)).astype(np.float32)
+    ts = np.arange(len(amp), dtype=np.int64)
+    buf_mgr = RealtimeCSIBufferManager([TOPIC], buffer_size=4096)
+    executor = ThreadPoolExecutor(max_workers=1)
+    processor = SlidingCadaProcessor(TOPIC, buf_mgr, WINDOW, STRIDE, WIN_SIZE, executor=executor,
+                                     policy=policy, max_pending=max_pending)
+    gate = threading.Event()
+    process_window = processor._process_window
+
+    def held(*args):
+        gate.wait()
+        process_window(*args)
+
+    processor._process_window = held
+    for frame, t in zip(amp, ts):
+        processor.push(frame, int(t))
+    gate.set()
+    executor.shutdown(wait=True)
+    _, points = buf_mgr.cada_points(TOPIC)
+    return amp, processor.stats(), points
+
+
+def _window_tail(amp, end, n=STRIDE):
+    feature = cada_pipeline(amp[end - WINDOW:end].copy(), use_filter_normalization=False,
+                            WIN_SIZE=WIN_SIZE)["feature"]
+    return feature[-n:]
+
+
+@pytest.mark.parametrize("policy", ["drop_newest", "drop_oldest", "coalesce", "catch_up"])
+def test_every_due_window_is_processed_or_counted(policy):
+    _, stats, _ = _run(policy, max_pending=3)
+    assert stats["windows_due"] == N_WINDOWS
+    assert stats["windows_processed"] + stats["windows_dropped"] == N_WINDOWS
+    assert stats["pending"] == 0
+
+
+def test_drop_newest_keeps_only_the_running_window():
+    amp, stats, (ts_ms, activity, _, _) = _run("drop_newest")
+    assert stats["windows_processed"] == 1 and stats["windows_dropped"] == N_WINDOWS - 1
+    np.testing.assert_array_equal(ts_ms, np.arange(WINDOW - STRIDE, WINDOW))
+    np.testing.assert_allclose(activity, _window_tail(amp, WINDOW), rtol=1e-5, atol=1e-5)
+
+
+def test_drop_oldest_keeps_the_newest_pending_windows():
+    amp, stats, (ts_ms, activity, _, _) = _run("drop_oldest", max_pending=2)
+    assert stats["windows_dropped"] == N_WINDOWS - 3
+    ends = [WINDOW, WINDOW + (N_WINDOWS - 2) * STRIDE, WINDOW + (N_WINDOWS - 1) * STRIDE]
+    np.testing.assert_array_equal(ts_ms, np.concatenate([np.arange(e - STRIDE, e) for e in ends]))
+    np.testing.assert_allclose(activity, np.concatenate([_window_tail(amp, e) for e in ends]),
+                               rtol=1e-5, atol=1e-5)
+
+
+def test_coalesce_publishes_a_gapless_series():
+    amp, stats, (ts_ms, activity, _, _) = _run("coalesce")
+    assert stats["windows_dropped"] == 0
+    assert stats["windows_coalesced"] == N_WINDOWS - 2
+    # 합쳐진 stride 들은 최신 윈도 하나에서 모두 발행 → 시각이 끊김 없이 이어짐
+    np.testing.assert_array_equal(ts_ms, np.arange(WINDOW - STRIDE, len(amp)))
+    merged = (N_WINDOWS - 1) * STRIDE
+    np.testing.assert_allclose(activity[STRIDE:], _window_tail(amp, len(amp), merged), rtol=1e-5, atol=1e-5)
+
+
+def test_catch_up_matches_per_window_pipeline():
+    amp, stats, (ts_ms, activity, _, _) = _run("catch_up")
+    assert stats["windows_dropped"] == 0
+    ends = range(WINDOW, len(amp) + 1, STRIDE)
+    np.testing.assert_array_equal(ts_ms, np.arange(WINDOW - STRIDE, len(amp)))
+    np.testing.assert_allclose(activity, np.concatenate([_window_tail(amp, e) for e in ends]),
+                               rtol=1e-5, atol=1e-5)
@@ -0,0 +1,115 @@
+import re
+
+import numpy as np
+import pytest
+
+from src.CADA import CADA_process as cp
+from src.CADA.CADA_process import (
+    encode_binary_payload, keep_subcarrier_indices, parse_and_normalize_payload,
+    parse_and_normalize_payloads, parse_timestamp_ms,
+)
+
+SUBCARRIERS = 52
+REMOVE = list(range(21, 32))
+TS = "250101123456789"
+
+
+def reference_parse(payload, topic, mu_bg_dict, sigma_bg_dict):
+    """The original regex / split / complex / np.delete parser (reference)."""
+    packet_time = parse_timestamp_ms(re.search(r"time=(\d{15})", payload).group(1))
+    csi_values = list(map(int, payload.split("CSI values: ")[-1].strip().split()))
+    if len(csi_values) < SUBCARRIERS * 2:
+        return None
+    csi_complex = np.array([csi_values[i] + 1j * csi_values[i + 1]
+                            for i in range(0, len(csi_values), 2)])[:SUBCARRIERS]
+    amp = np.abs(np.delete(csi_complex, REMOVE))
+    if topic in mu_bg_dict:
+        amp = (amp - mu_bg_dict[topic]) / sigma_bg_dict[topic]
+    return amp, packet_time
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    iq = rng.integers(-100, 100, (20, 128))
+    payloads = [f"CSI_DATA,mac=aa time={TS} rssi=-40 CSI values: {' '.join(map(str, row))}\n" for row in iq]
+    n_keep = SUBCARRIERS - len(REMOVE)
+    calib = ({"a": rng.normal(size=n_keep)}, {"a": rng.random(n_keep) + 0.5})
+    return iq, payloads, calib
+
+
+@pytest.mark.parametrize("topic", ["a", "uncalibrated"])
+def test_str_and_bytes_match_reference(data, topic):
+    _, payloads, (mu, sigma) = data
+    for payload in payloads:
+        expected = reference_parse(payload, topic, mu, sigma)
+        for p in (payload, payload.encode()):
+            amp_z, packet_time = parse_and_normalize_payload(p, topic, SUBCARRIERS, REMOVE, mu, sigma)
+            np.testing.assert_allclose(amp_z, expected[0], rtol=1e-12, atol=1e-12)
+            assert packet_time == expected[1]
+
+
+@pytest.mark.parametrize("wire", ["binary8", "binary16"])
+def test_binary_matches_text(data, wire):
+    iq, payloads, (mu, sigma) = data
+    for row, payload in zip(iq, payloads):
+        binary = encode_binary_payload(int(TS), row[:SUBCARRIERS * 2], wire)
+        text = parse_and_normalize_payload(payload, "a", SUBCARRIERS, REMOVE, mu, sigma)
+        amp_z, packet_time = parse_and_normalize_payload(binary, "a", SUBCARRIERS, REMOVE, mu, sigma)
+        np.testing.assert_allclose(amp_z, text[0], rtol=1e-12, atol=1e-12)
+        assert packet_time == text[1]
+
+
+def test_batch_matches_single(data):
+    iq, payloads, (mu, sigma) = data
+    batch = [p.encode() for p in payloads[:8]]
+    batch += [encode_binary_payload(int(TS), iq[8, :SUBCARRIERS * 2])]
+    batch += [b"time=250101123456789 CSI values: 1 2 3"]           # 값 부족
+    batch += [b"time=250101123456789 CSI values: 1 2 x 4" + b" 5" * 200]  # 잘못된 토큰
+    batch += [p.encode() for p in payloads[9:]]
+    topics = ["a" if i % 2 else "uncalibrated" for i in range(len(batch))]
+    amp_z, packet_times, valid = parse_and_normalize_payloads(batch, topics, SUBCARRIERS, REMOVE, mu, sigma)
+
+    for i, (payload, topic) in enumerate(zip(batch, topics)):
+        single = parse_and_normalize_payload(payload, topic, SUBCARRIERS, REMOVE, mu, sigma)
+        assert valid[i] == (single is not None)
+        if single is None:
+            assert not amp_z[i].any() and packet_times[i] == 0
+        else:
+            np.testing.assert_allclose(amp_z[i], single[0], rtol=1e-12, atol=1e-12)
+            assert packet_times[i] == single[1]
+
+
+def test_batch_with_varying_value_counts(data):
+    _, payloads, (mu, sigma) = data
+    batch = [payloads[0], payloads[1].rstrip() + " 7 8\n", payloads[2]]
+    amp_z, _, valid = parse_and_normalize_payloads(batch, "a", SUBCARRIERS, REMOVE, mu, sigma)
+    assert valid.all()
+    for i, payload in enumerate(batch):
+        np.testing.assert_allclose(amp_z[i], reference_parse(payload, "a", mu, sigma)[0], rtol=1e-12)
+
+
+def test_malformed_token_is_rejected_without_strict_fromstring(monkeypatch, data):
+    # numpy < 2 경로 (잘못된 토큰에서 부분 배열) 도 토큰 수 확인으로 거부
+    monkeypatch.setattr(cp, "_FROMSTRING_STRICT", False)
+    _, payloads, (mu, sigma) = data
+    # 잘못된 토큰이 사용 구간 뒤에 있어도 (부분 배열 길이는 충분) 거부
+    corrupt = payloads[0].rstrip() + " 12x 5\n"
+    assert parse_and_normalize_payload(corrupt, "a", SUBCARRIERS, REMOVE, mu, sigma) is None
+    assert parse_and_normalize_payload(payloads[0], "a", SUBCARRIERS, REMOVE, mu, sigma) is not None
+
+
+def test_calibration_mismatch_invalidates_only_that_row(data):
+    _, payloads, (mu, sigma) = data
+    mu = {"a": mu["a"], "b": np.zeros(3)}
+    sigma = {"a": sigma["a"], "b": np.ones(3)}
+    _, packet_times, valid = parse_and_normalize_payloads(payloads[:4], ["a", "b", "a", "b"],
+                                                          SUBCARRIERS, REMOVE, mu, sigma)
+    np.testing.assert_array_equal(valid, [True, False, True, False])
+    assert packet_times[1] == 0
+
+
+def test_out_of_range_indices_to_remove():
+    with pytest.raises(ValueError):
+        keep_subcarrier_indices(SUBCARRIERS, [3, 52])
+    np.testing.assert_array_equal(keep_subcarrier_indices(4, [1, -1]), [0, 2])
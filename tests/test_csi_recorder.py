@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.CADA.CADA_process import SlidingCadaProcessor
+from src.CADA.cada_offline import load_series, run_offline_cada
+from src.CADA.csi_buffer_utils import RealtimeCSIBufferManager
+from src.CADA.csi_recorder import CSIRecorder, CSIRecording
+
+TOPIC = "L0382/ESP/1"
+
+
+def _frames(n, subcarriers=41, seed=0):
+    rng = np.random.default_rng(seed)
+    amp = rng.normal(size=(n, subcarriers)).astype(np.float32)
+    ts = 1_700_000_000_000 + 10 * np.arange(n, dtype=np.int64)
+    # 장치 시계 재설정: 중간부터 시각이 과거로 돌아감
+    ts[n // 2:] -= 3_600_000
+    return amp, ts
+
+
+def _record(root, amp, ts, chunk_frames=100):
+    recorder = CSIRecorder(str(root), chunk_frames=chunk_frames, flush_interval=3600)
+    for frame, t in zip(amp, ts):
+        recorder.record(TOPIC, frame, int(t))
+    recorder.close()
+
+
+def test_round_trip_keeps_arrival_order(tmp_path):
+    amp, ts = _frames(1030)
+    _record(tmp_path, amp, ts)
+    recording = CSIRecording(str(tmp_path))
+
+    assert recording.frame_count(TOPIC) == len(amp)
+    read_ts, read_amp = recording.read(TOPIC)
+    np.testing.assert_array_equal(read_ts, ts)
+    np.testing.assert_array_equal(read_amp, amp)
+
+    frames_ts, frames_amp = recording.read_frames(TOPIC, 450, 620)
+    np.testing.assert_array_equal(frames_ts, ts[450:620])
+    np.testing.assert_array_equal(frames_amp, amp[450:620])
+
+    # 시간 구간 필터는 순서를 바꾸지 않음
+    lo, hi = int(ts[100]), int(ts[499])
+    window_ts, _ = recording.read(TOPIC, lo, hi)
+    np.testing.assert_array_equal(window_ts, ts[(ts >= lo) & (ts <= hi)])
+
+
+def test_offline_runner_matches_online_processor(tmp_path):
+    window, stride, win_size = 320, 40, 64
+    amp, ts = _frames(window + 15 * stride)
+    _record(tmp_path / "rec", amp, ts, chunk_frames=128)
+
+    buf_mgr = RealtimeCSIBufferManager([TOPIC], buffer_size=4096)
+    executor = ThreadPoolExecutor(max_workers=1)
+    processor = SlidingCadaProcessor(TOPIC, buf_mgr, window, stride, win_size,
+                                     executor=executor, policy="block")
+    for frame, t in zip(amp, ts):
+        processor.push(frame, int(t))
+    executor.shutdown(wait=True)
+    _, (online_ts, activity, flag, threshold) = buf_mgr.cada_points(TOPIC)
+
+    run_offline_cada(str(tmp_path / "rec"), str(tmp_path / "out"), window_size=window, stride=stride,
+                     small_win_size=win_size, segment_windows=4, max_workers=1)
+    series = load_series(str(tmp_path / "out"), TOPIC)
+    np.testing.assert_array_equal(series["ts"], online_ts)
+    np.testing.assert_allclose(series["feature"], activity, rtol=1e-5, atol=1e-5)
+    np.testing.assert_array_equal(series["activity_flag"].astype(bool), flag.astype(bool))
+    np.testing.assert_allclose(series["threshold"], threshold, rtol=1e-5)
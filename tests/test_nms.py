@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from src.utils import batched_nms, compute_iou, multiclass_nms, nms
+
+
+def loop_nms(boxes, scores, iou_threshold):
+    """Reference per-box loop (the original implementation, with a stable sort for ties)."""
+    sorted_indices = np.argsort(scores, kind="stable")[::-1]
+    keep_boxes = []
+    while sorted_indices.size > 0:
+        box_id = sorted_indices[0]
+        keep_boxes.append(int(box_id))
+        ious = compute_iou(boxes[box_id, :], boxes[sorted_indices[1:], :])
+        sorted_indices = sorted_indices[np.where(ious < iou_threshold)[0] + 1]
+    return keep_boxes
+
+
+def loop_multiclass_nms(boxes, scores, class_ids, iou_threshold):
+    keep_boxes = []
+    for class_id in np.unique(class_ids):
+        class_indices = np.where(class_ids == class_id)[0]
+        kept = loop_nms(boxes[class_indices, :], scores[class_indices], iou_threshold)
+        keep_boxes.extend(int(i) for i in class_indices[kept])
+    return keep_boxes
+
+
+def _case(rng, n, n_classes, tied):
+    centers = rng.uniform(0, 200, (max(1, n // 4), 2))
+    c = centers[rng.integers(0, len(centers), n)] + rng.normal(0, 6, (n, 2))
+    half = rng.uniform(10, 40, (n, 2))
+    boxes = np.concatenate([c - half, c + half], axis=1).astype(np.float32)
+    # tied: 점수 5 단계만 사용 → 동점 다수
+    scores = (rng.integers(1, 6, n) / 5 if tied else rng.uniform(0, 1, n)).astype(np.float32)
+    return boxes, scores, rng.integers(0, n_classes, n)
+
+
+@pytest.mark.parametrize("tied", [False, True])
+def test_multiclass_nms_matches_per_class_loop(tied):
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        n = int(rng.integers(1, 60))
+        boxes, scores, class_ids = _case(rng, n, int(rng.integers(1, 5)), tied)
+        iou = float(rng.uniform(0.2, 0.8))
+        assert multiclass_nms(boxes, scores, class_ids, iou) == \
+            loop_multiclass_nms(boxes, scores, class_ids, iou)
+
+
+@pytest.mark.parametrize("tied", [False, True])
+def test_nms_matches_loop(tied):
+    rng = np.random.default_rng(1)
+    for _ in range(100):
+        boxes, scores, _ = _case(rng, int(rng.integers(1, 200)), 1, tied)
+        assert nms(boxes, scores, 0.5) == loop_nms(boxes, scores, 0.5)
+
+
+def test_batched_nms_matches_loop_per_image_and_class():
+    rng = np.random.default_rng(2)
+    for _ in range(100):
+        n_images, per_image = int(rng.integers(1, 4)), int(rng.integers(1, 50))
+        boxes, scores, class_ids = _case(rng, n_images * per_image, 3, tied=True)
+        image_ids = np.repeat(np.arange(n_images), per_image)
+        keep = batched_nms(boxes, scores, 0.5, class_ids=class_ids, image_ids=image_ids)
+
+        expected = []
+        for i in range(n_images):
+            sl = slice(i * per_image, (i + 1) * per_image)
+            expected += [k + i * per_image for k in
+                         loop_multiclass_nms(boxes[sl], scores[sl], class_ids[sl], 0.5)]
+        assert sorted(keep.tolist()) == sorted(expected)
+        # 전체 결과는 점수 내림차순, 동점은 인덱스가 큰 쪽이 먼저
+        order = np.lexsort((-keep, -scores[keep]))
+        np.testing.assert_array_equal(order, np.arange(len(keep)))
+
+
+def test_empty_input():
+    assert nms(np.empty((0, 4)), np.empty(0), 0.5) == []
+    assert batched_nms(np.empty((0, 4)), np.empty(0), 0.5).size == 0
@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.CADA.CADA_process import SlidingCadaProcessor, cada_pipeline
+from src.CADA.csi_buffer_utils import RealtimeCSIBufferManager
+
+TOPIC = "L0382/ESP/1"
+WINDOW, STRIDE, WIN_SIZE = 320, 40, 64
+
+
+def _frames(n, subcarriers=41, seed=0):
+    rng = np.random.default_rng(seed)
+    amp = rng.normal(size=(n, subcarriers))
+    amp[n // 3:n // 2] *= 3.0                               # 움직임 구간
+    amp[rng.integers(0, n, 20), rng.integers(0, subcarriers, 20)] += 25.0  # Hampel 대상 스파이크
+    return amp.astype(np.float32)
+
+
+def _expected(amp, threshold_factor=2.5):
+    """Per-window cada_pipeline (medfilt Hampel) + EWMA, as the processor publishes it."""
+    features, flags, thresholds = [], [], []
+    ewma = 0.0
+    for end in range(WINDOW, len(amp) + 1, STRIDE):
+        # robust_hampel 은 열을 제자리에서 바꾸므로 복사본 전달
+        feature = cada_pipeline(amp[end - WINDOW:end].copy(), use_filter_normalization=False,
+                                WIN_SIZE=WIN_SIZE, hampel_impl="medfilt")["feature"]
+        avg = float(np.mean(feature))
+        ewma = avg if ewma == 0.0 else 0.01 * avg + 0.99 * ewma
+        tail = feature[-STRIDE:]
+        features.append(tail)
+        flags.append(tail > threshold_factor * ewma)
+        thresholds.append(np.full(STRIDE, threshold_factor * ewma))
+    return np.concatenate(features), np.concatenate(flags), np.concatenate(thresholds)
+
+
+def test_processor_matches_cada_pipeline_per_window():
+    amp = _frames(WINDOW + 12 * STRIDE)
+    ts = 1_700_000_000_000 + 10 * np.arange(len(amp), dtype=np.int64)
+    buf_mgr = RealtimeCSIBufferManager([TOPIC], buffer_size=4096)
+    executor = ThreadPoolExecutor(max_workers=1)
+    # block: 모든 윈도를 순서대로 처리
+    processor = SlidingCadaProcessor(TOPIC, buf_mgr, WINDOW, STRIDE, WIN_SIZE,
+                                     executor=executor, policy="block")
+    for frame, t in zip(amp, ts):
+        processor.push(frame, int(t))
+    executor.shutdown(wait=True)
+
+    _, (ts_ms, activity, flag, threshold) = buf_mgr.cada_points(TOPIC)
+    feature, expected_flag, expected_threshold = _expected(amp)
+    np.testing.assert_allclose(activity, feature, rtol=1e-5, atol=1e-5)
+    np.testing.assert_array_equal(flag.astype(bool), expected_flag)
+    np.testing.assert_allclose(threshold, expected_threshold, rtol=1e-5)
+    # 특징 샘플은 각 윈도 마지막 stride 프레임의 패킷 시각
+    np.testing.assert_array_equal(ts_ms, ts[WINDOW - STRIDE:])
+    assert processor.stats()["windows_dropped"] == 0